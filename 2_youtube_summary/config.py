@@ -5,8 +5,61 @@ All configuration loading and constants are defined here.
 
 import yaml
 import os
+import sys
+import json
+import logging
+import functools
+import dataclasses
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+# The pipeline logger, looked up by name so config has no src dependency. src.logger replaces
+# this plain stdout handler when imported; until then config's own messages still show up
+logger = logging.getLogger("youtube_pipeline")
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _Loader
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
+# JSON serialization shared by every reader/writer in the pipeline.
+# dumps() returns pretty-printed UTF-8 bytes, dumps_line() a compact single line.
+if orjson is not None:
+    JSON_DUMP_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    dumps = functools.partial(orjson.dumps, option=JSON_DUMP_OPTS)
+    dumps_line = functools.partial(orjson.dumps, option=JSON_DUMP_OPTS & ~orjson.OPT_INDENT_2)
+    loads = orjson.loads
+else:
+    def _json_default(obj: Any) -> Any:
+        if dataclasses.is_dataclass(obj):
+            return dataclasses.asdict(obj)
+        if hasattr(obj, 'tolist'):  # numpy scalars and arrays
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+    def dumps_line(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+    loads = json.loads
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, aggregated results stay plain JSON
+    zstandard = None
 
 # Project structure constants
 PROJECT_ROOT = Path(__file__).parent  # config.py is in project root
@@ -14,6 +67,8 @@ CONFIG_FILE = PROJECT_ROOT / "config.yaml"
 DATA_DIR = PROJECT_ROOT / "data"
 COMMENTS_DIR = DATA_DIR / "comments"
 ANALYSIS_DIR = DATA_DIR / "analysis"
+REPORT_CACHE_DIR = DATA_DIR / "report_cache"  # LLM report responses keyed by request hash
+AGGREGATED_ANALYSIS_FILE = DATA_DIR / "aggregated_analysis.json"
 REPORTS_DIR = PROJECT_ROOT / "reports"
 LOGS_DIR = PROJECT_ROOT / "logs"
 
@@ -22,76 +77,161 @@ COMMENT_FILE_PATTERN = "comments_{video_id}.json"  # Remove timestamp from patte
 ANALYSIS_FILE_PATTERN = "analysis_{video_id}.json"
 AUDIENCE_FILE_PATTERN = "audience_{video_id}.json"
 INDEX_FILE = "video_comments_index.json"
+LANGUAGE_ID_MODEL_FILE = DATA_DIR / "lid.176.bin"  # optional fastText language-ID model
 
-# Global config instance
-_config = None
-
-def get_config() -> dict[str, Any]:
-    """Load configuration from YAML file."""
-    global _config
-    if _config is None:
+@functools.lru_cache(maxsize=1)
+def _load_config() -> dict[str, Any]:
+    """Read and validate the YAML configuration file."""
+    try:
         try:
-            if CONFIG_FILE.exists():
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as file:
-                    _config = yaml.safe_load(file)
-                    
-                if not _config:
-                    raise ValueError("Config file is empty or invalid")
-                
-                # Validate required fields
-                if 'video_urls' not in _config or not _config['video_urls']:
-                    raise ValueError("video_urls is required in config.yaml")
-                
-                print(f"✓ Configuration loaded from: {CONFIG_FILE}")
-                
-            else:
-                raise FileNotFoundError(f"Configuration file not found: {CONFIG_FILE}")
-                
-        except Exception as e:
-            print(f"✗ Error loading configuration: {e}")
-            print(f"  Expected location: {CONFIG_FILE}")
-            print(f"  Current working directory: {os.getcwd()}")
-            raise
+            with open(CONFIG_FILE, 'rb') as file:
+                config = yaml.load(file.read(), Loader=_Loader)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Configuration file not found: {CONFIG_FILE}") from None
+
+        if not config:
+            raise ValueError("Config file is empty or invalid")
+        
+        # Validate required fields
+        if 'video_urls' not in config or not config['video_urls']:
+            raise ValueError("video_urls is required in config.yaml")
+        
+        logger.info(f"✓ Configuration loaded from: {CONFIG_FILE}")
+            
+    except Exception as e:
+        logger.error(f"✗ Error loading configuration: {e}")
+        logger.error(f"  Expected location: {CONFIG_FILE}")
+        logger.error(f"  Current working directory: {os.getcwd()}")
+        raise
     
-    return _config
+    return config
+
+
+def get_config() -> dict[str, Any]:
+    """Load configuration from YAML file (parsed once per process)."""
+    return _load_config()
+
+
+def get_aggregated_analysis_path() -> Path:
+    """Path of the aggregated results: .json.zst when compress_aggregated is set (and zstandard is installed)."""
+    if zstandard is not None and get_config().get('compress_aggregated'):
+        return AGGREGATED_ANALYSIS_FILE.with_suffix('.json.zst')
+    return AGGREGATED_ANALYSIS_FILE
+
 
+def _require_zstandard(path: Path) -> None:
+    """Fail clearly when a .zst file is used without the optional zstandard package."""
+    if zstandard is None:
+        raise RuntimeError(f"install zstandard to read/write .zst files: {path}")
 
-# Ensure all required directories exist
-directories = [COMMENTS_DIR, ANALYSIS_DIR, REPORTS_DIR, LOGS_DIR]
-for directory in directories:
-    directory.mkdir(parents=True, exist_ok=True)
+
+def compress_if_zst(path: Path, data: bytes) -> bytes:
+    """Zstd-compress data destined for a .zst file; other files are written as-is."""
+    if Path(path).suffix == '.zst':
+        _require_zstandard(path)
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def read_json_file(path: Path) -> Any:
+    """Read a JSON file, stream-decompressing it first if it is a .zst file."""
+    with open(path, 'rb') as file:
+        if Path(path).suffix != '.zst':
+            return loads(file.read())
+        _require_zstandard(path)
+        with zstandard.ZstdDecompressor().stream_reader(file) as reader:
+            return loads(reader.read())
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Typed, read-only view of the pipeline settings."""
+    analysis_model: str
+    video_urls: tuple[str, ...]
+    filter_language: Optional[str] = None
+    output_language: Optional[str] = None
+    min_length: int = 10
+    batch_size: int = 20
+    max_comments: int = 1000
+    max_video_workers: int = 3
+    max_batch_workers: int = 2
+    executor_kind: str = 'process'
+    use_cache: bool = True
+    analyze_audience: bool = False
+
+    @classmethod
+    def from_dict(cls, config: dict[str, Any]) -> "Config":
+        """Build settings from a raw config dict, ignoring unknown keys."""
+        values = {name: config[name] for name in cls.__dataclass_fields__ if name in config}
+        values['video_urls'] = tuple(config.get('video_urls') or ())
+        return cls(**values)
+
+
+@functools.lru_cache(maxsize=1)
+def get_settings() -> Config:
+    """Get the typed settings parsed from the YAML configuration."""
+    return Config.from_dict(get_config())
+
+
+@functools.lru_cache(maxsize=1)
+def ensure_directories() -> None:
+    """Create all required directories (once per process, on first write)."""
+    for directory in [COMMENTS_DIR, ANALYSIS_DIR, REPORTS_DIR, LOGS_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
+
+# Set once validate_environment() has passed in this process
+_validated = False
 
 def validate_environment():
     """Validate required environment variables and configuration."""
+    global _validated
+    if _validated:
+        return
+
+    if os.getenv('OPENAI_API_KEY') and CONFIG_FILE.exists():
+        _validated = True
+        logger.info("✓ Environment validation passed")
+        return
+
     errors = []
-    
     if not os.getenv('OPENAI_API_KEY'):
         errors.append("OPENAI_API_KEY environment variable not set")
-    
     if not CONFIG_FILE.exists():
         errors.append(f"Configuration file not found: {CONFIG_FILE}")
-    
-    if errors:
-        print("✗ Environment validation failed:")
-        for error in errors:
-            print(f"  - {error}")
-        raise EnvironmentError("Environment validation failed")
-    print("✓ Environment validation passed")
 
+    logger.error("✗ Environment validation failed:")
+    for error in errors:
+        logger.error(f"  - {error}")
+    raise EnvironmentError("Environment validation failed")
+
+@functools.lru_cache(maxsize=4096)
 def get_video_id_from_url(video_url: str) -> str:
-    """Extract video ID from YouTube URL."""
-    return video_url.split('v=')[-1].split('&')[0]
+    """Extract video ID from YouTube URL (watch?v=..., youtu.be/... or shorts/...)."""
+    parsed = urlparse(video_url)
+    if parsed.hostname and parsed.hostname.endswith('youtu.be'):
+        return parsed.path.lstrip('/')
+    video_ids = parse_qs(parsed.query).get('v')
+    if video_ids:
+        return video_ids[0]
+    # Path-style URLs such as /shorts/<id> or /embed/<id>
+    return parsed.path.rstrip('/').rsplit('/', 1)[-1]
 
+@functools.lru_cache(maxsize=None)
 def get_comment_file_path(video_id: str) -> Path:
     """Get the full path for a comment file."""
+    ensure_directories()
     filename = COMMENT_FILE_PATTERN.format(video_id=video_id)  # Remove timestamp parameter
     return COMMENTS_DIR / filename
 
+@functools.lru_cache(maxsize=None)
 def get_analysis_file_path(video_id: str) -> Path:
     """Get the full path for an analysis file."""
+    ensure_directories()
     filename = ANALYSIS_FILE_PATTERN.format(video_id=video_id)
     return ANALYSIS_DIR / filename
 
+@functools.lru_cache(maxsize=None)
 def get_index_file_path() -> Path:
     """Get the full path for the video index file."""
+    ensure_directories()
     return DATA_DIR / INDEX_FILE
@@ -1,43 +1,109 @@
 """
-Multi-threaded video analysis coordinator.
+Parallel video analysis coordinator.
 Processes multiple videos in parallel and manages the overall analysis workflow.
 """
 
 import os
 import time
-import json
+import hashlib
+from collections import deque
+from dataclasses import dataclass, fields
 from json import JSONDecodeError
+from operator import itemgetter
+from pathlib import Path
 from typing import Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 
 import config
 from src import utils
-from src.analyze_video import analyze_single_video
+from src.logger import start_listener
+from src.analyze_video import analyze_single_video, analyze_videos_batchapi, has_cached_analysis
+
+
+@dataclass(slots=True)
+class VideoSummary:
+    """Per-video entry of the aggregated results."""
+    video_id: str
+    video_url: str
+    analysis_summary: Optional[dict[str, Any]]
+    audience_analysis: Optional[dict[str, Any]]
+    analysis_timestamp: Optional[str]
+
+
+@dataclass(slots=True)
+class AnalysisMetadata:
+    """Run-level metadata of the aggregated results."""
+    total_videos: int
+    analysis_timestamp: Optional[str]
+    config_id: Optional[str]  # fingerprint of the config stored in config_<id>.json
+
+
+@dataclass(slots=True)
+class AggregatedAnalysis:
+    """Layout of aggregated_analysis.json (serialized natively by orjson)."""
+    analysis_metadata: AnalysisMetadata
+    video_analyses: list[VideoSummary]
+
+
+# Fields copied from each video analysis into the aggregated results
+SUMMARY_FIELDS = tuple(field.name for field in fields(VideoSummary))
+_get_summary_fields = itemgetter(*SUMMARY_FIELDS)
+
 
 def load_video_index(index_path: str = None) -> dict:
     """Load the video comments index file."""
     if index_path is None:
         index_path = config.get_index_file_path()
     
-    with open(index_path, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    with open(index_path, 'rb') as file:
+        return config.loads(file.read())
+
+
+def build_video_summary(analysis: dict[str, Any]) -> VideoSummary:
+    """Extract the per-video fields that go into the aggregated results."""
+    return VideoSummary(*_get_summary_fields(analysis))
 
 
-def process_single_video_wrapper(video_info: dict[str, Any], config_dict: dict[str, Any]) -> Optional[dict[str, Any]]:
-    """Wrapper function for processing a single video in a thread."""
+# Config installed once per worker process by _init_worker
+_WORKER_CFG: Optional[dict[str, Any]] = None
+
+
+def _init_worker(config_dict: dict[str, Any]) -> None:
+    """Process pool initializer: keep the shared config so it is not pickled per task."""
+    global _WORKER_CFG
+    _WORKER_CFG = config_dict
+
+
+def _read_comment_file(comment_file: str) -> Optional[bytes]:
+    """Read a comment file for prefetching; on failure the worker reads (and reports) it itself."""
+    try:
+        with open(comment_file, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def process_single_video_wrapper(video_info: dict[str, Any], config_dict: Optional[dict[str, Any]] = None) -> Optional[dict[str, Any]]:
+    """Wrapper function for processing a single video in a worker thread or process.
+
+    Process pool workers omit config_dict and use the config installed by _init_worker.
+    """
+    if config_dict is None:
+        config_dict = _WORKER_CFG
     video_id = video_info['video_id']
     video_url = video_info['video_url']
     comment_file = video_info['comment_file']
     
     try:
-        return analyze_single_video(video_id, video_url, comment_file, config_dict)
+        return analyze_single_video(video_id, video_url, comment_file, config_dict,
+                                    comment_data=video_info.get('comment_data'))
     except Exception as e:
         utils.print_error(f"Error processing video {video_id}: {e}")
         return None
 
 
 def analyze_all_videos_parallel(cfg) -> list[dict[str, Any]]:
-    """Analyze all videos in parallel using ThreadPoolExecutor."""
+    """Analyze all videos in parallel using a process or thread pool."""
     utils.print_progress("Starting parallel video analysis...")
     
     # Load video index
@@ -49,92 +115,170 @@ def analyze_all_videos_parallel(cfg) -> list[dict[str, Any]]:
         utils.print_error(f"Error loading video index: {e}")
         utils.print_progress("Please run download_comments.py first to download the comments.")
         return []
-    except Exception as e:
-        utils.print_error(f"Unexpected error loading video index: {e}")
+    except (OSError, KeyError, TypeError) as e:
+        utils.print_error(f"Invalid or unreadable video index: {e}")
         return []
     
     if not videos_to_process:
         utils.print_error("No videos found to process")
         return []
     
+    # The Batch API path submits one job for all videos instead of running a worker per video
+    if cfg.get('use_batch_api', False):
+        start_time = time.monotonic()
+        targets = [(video_info['video_id'], video_info['video_url'], video_info['comment_file'])
+                   for video_info in videos_to_process]
+        results = analyze_videos_batchapi(targets, cfg)
+        successful_analyses = [results[video_id] for video_id, _, _ in targets if results.get(video_id)]
+        print_analysis_summary(len(successful_analyses), len(videos_to_process), start_time)
+        return successful_analyses
+    
     # Configure parallel processing
-    max_workers = cfg.get('max_video_workers')
-    max_workers = min(max_workers, len(videos_to_process))
+    settings = config.Config.from_dict(cfg)
+    executor_kind = settings.executor_kind
+    max_workers = min(settings.max_video_workers, len(videos_to_process))
+    if executor_kind == 'process':
+        max_workers = min(max_workers, os.cpu_count() or 1)
+        executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(cfg,))
+        task_args = ()
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        task_args = (cfg,)
 
-    utils.print_progress(f"Using {max_workers} parallel workers for video analysis")
+    utils.print_progress(f"Using {max_workers} parallel {executor_kind} workers for video analysis")
 
     successful_analyses = []
-    start_time = time.time()
-    
-    # Process videos in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_video = {
-            executor.submit(process_single_video_wrapper, video_info, cfg): video_info
-            for video_info in videos_to_process
-        }
-        
-        completed_count = 0
-        for future in as_completed(future_to_video):
-            video_info = future_to_video[future]
-            video_id = video_info['video_id']
+    completed_count = 0
+    total_videos = len(videos_to_process)
+    start_time = time.monotonic()
+
+    def collect_completed(done: set) -> None:
+        """Record results of finished futures (each tagged with its video_id)."""
+        nonlocal completed_count
+        for future in done:
+            video_id = future.video_id
             completed_count += 1
-            
+
             try:
                 result = future.result()
                 if result:
                     successful_analyses.append(result)
-                    utils.print_success(f"[{completed_count}/{len(videos_to_process)}] Completed: {video_id}")
+                    utils.print_success(f"[{completed_count}/{total_videos}] Completed: {video_id}")
                 else:
-                    utils.print_error(f"[{completed_count}/{len(videos_to_process)}] Failed: {video_id}")
+                    utils.print_error(f"[{completed_count}/{total_videos}] Failed: {video_id}")
 
             except Exception as e:
-                utils.print_error(f"[{completed_count}/{len(videos_to_process)}] Error processing {video_id}: {e}")
+                utils.print_error(f"[{completed_count}/{total_videos}] Error processing {video_id}: {e}")
+
+    # Process videos in parallel, keeping at most 2x max_workers tasks in flight.
+    # With thread workers, comment files of uncached videos are read ahead on a small I/O pool
+    # so disk reads overlap analysis; process workers read their own files (shipping the bytes
+    # to the worker costs about as much as the read).
+    prefetch_comments = executor_kind == 'thread'
+    max_inflight = max_workers * 2
+    inflight: set[Future] = set()
+    prefetched: deque = deque()
+    video_iter = iter(videos_to_process)
+
+    def prefetch_next() -> None:
+        video_info = next(video_iter, None)
+        if video_info is not None:
+            data_future = None
+            if prefetch_comments and not has_cached_analysis(video_info['video_id'], cfg):
+                data_future = prefetch_pool.submit(_read_comment_file, video_info['comment_file'])
+            prefetched.append((video_info, data_future))
+
+    with executor, ThreadPoolExecutor(max_workers=4, thread_name_prefix='prefetch') as prefetch_pool:
+        for _ in range(max_inflight):
+            prefetch_next()
+
+        while prefetched:
+            while len(inflight) >= max_inflight:
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                collect_completed(done)
+            video_info, data_future = prefetched.popleft()
+            prefetch_next()
+            task_info = {**video_info, 'comment_data': data_future.result() if data_future else None}
+            future = executor.submit(process_single_video_wrapper, task_info, *task_args)
+            future.video_id = video_info['video_id']
+            inflight.add(future)
+
+        while inflight:
+            done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+            collect_completed(done)
+
+    # Restore index order so repeated runs produce identical aggregated output
+    video_order = {video_info['video_id']: position for position, video_info in enumerate(videos_to_process)}
+    successful_analyses.sort(key=lambda analysis: video_order.get(analysis['video_id'], total_videos))
+
+    print_analysis_summary(len(successful_analyses), total_videos, start_time)
+    return successful_analyses
 
-    elapsed_time = time.time() - start_time
+
+def print_analysis_summary(successful_count: int, total_videos: int, start_time: float) -> None:
+    """Print how many videos were analyzed and how long it took."""
+    elapsed_time = time.monotonic() - start_time
     utils.print_section("Analysis Summary")
-    utils.print_success(f"Successfully analyzed: {len(successful_analyses)}/{len(videos_to_process)} videos")
+    utils.print_success(f"Successfully analyzed: {successful_count}/{total_videos} videos")
     utils.print_progress(f"Total time: {elapsed_time:.2f} seconds")
-    utils.print_progress(f"Average time per video: {elapsed_time/len(videos_to_process):.2f} seconds")
+    utils.print_progress(f"Average time per video: {elapsed_time/total_videos:.2f} seconds")
 
-    return successful_analyses
+
+def save_config_fingerprint(config_used: Optional[dict[str, Any]], output_path: str) -> Optional[str]:
+    """Store the run config once in a sibling config_<id>.json and return its id.
+
+    The id is a BLAKE2b fingerprint of the key-sorted config, so identical
+    configs share one file instead of being embedded in every aggregate.
+    """
+    if not config_used:
+        return None
+
+    config_bytes = config.dumps(dict(sorted(config_used.items())))
+    config_id = hashlib.blake2b(config_bytes, digest_size=8).hexdigest()
+    config_path = Path(output_path).with_name(f"config_{config_id}.json")
+    try:
+        if not config_path.exists():
+            config_path.write_bytes(config_bytes)
+    except OSError as e:
+        utils.print_warning(f"Could not save config fingerprint file {config_path}: {e}")
+    return config_id
 
 
 def save_aggregated_results(analyses: list[dict[str, Any]], output_path: str = None) -> None:
     """Save all analysis results to a single aggregated file."""
     if output_path is None:
-        output_path = config.DATA_DIR / "aggregated_analysis.json"
+        output_path = config.get_aggregated_analysis_path()
     
     if not analyses:
         utils.print_warning("No analyses to save")
         return
     
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
     
-    # Prepare aggregated data
-    aggregated_data = {
-        'analysis_metadata': {
-            'total_videos': len(analyses),
-            'analysis_timestamp': analyses[0].get('analysis_timestamp') if analyses else None,
-            'config_used': analyses[0].get('config_used') if analyses else None
-        },
-        'video_analyses': []
-    }
+    config_id = save_config_fingerprint(analyses[0].get('config_used'), output_path)
     
-    # Extract summaries
-    for analysis in analyses:
-        video_summary = {
-            'video_id': analysis.get('video_id'),
-            'video_url': analysis.get('video_url'),
-            'analysis_summary': analysis.get('analysis_summary'),
-            'audience_analysis': analysis.get('audience_analysis'),
-            'analysis_timestamp': analysis.get('analysis_timestamp')
-        }
-        aggregated_data['video_analyses'].append(video_summary)
+    # Prepare aggregated data
+    aggregated_data = AggregatedAnalysis(
+        analysis_metadata=AnalysisMetadata(
+            total_videos=len(analyses),
+            analysis_timestamp=analyses[0].get('analysis_timestamp'),
+            config_id=config_id
+        ),
+        video_analyses=[build_video_summary(analysis) for analysis in analyses]
+    )
     
-    # Save aggregated results
+    # Save aggregated results, skipping the write when the content is unchanged
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(aggregated_data, f, indent=2, ensure_ascii=False)
+        serialized = config.dumps(aggregated_data)
+        digest = hashlib.blake2b(serialized, digest_size=16).digest()
+        digest_path = Path(output_path).with_suffix('.blake2')
+        if Path(output_path).exists() and digest_path.exists() and digest_path.read_bytes() == digest:
+            utils.print_success(f"Aggregated analysis unchanged, skipped writing: {output_path}")
+            return
+
+        with open(output_path, 'wb', buffering=1024 * 1024) as f:
+            f.write(config.compress_if_zst(output_path, serialized))
+        digest_path.write_bytes(digest)
         utils.print_success(f"Saved aggregated analysis to: {output_path}")
     except Exception as e:
         utils.print_error(f"Error saving aggregated analysis: {e}")
@@ -149,18 +293,23 @@ def main():
         utils.print_step(1, 4, "Setup and Configuration")
         config.validate_environment()
         cfg = config.get_config()
+        settings = config.get_settings()
+        if settings.executor_kind == 'thread':
+            # Process workers are forked, so only thread runs hand console output to a listener thread
+            start_listener()
 
         utils.print_success("Configuration loaded:")
-        utils.print_progress(f"Analysis model: {cfg.get('analysis_model')}")
-        utils.print_progress(f"Filter language: {cfg.get('filter_language', 'all languages')}")
-        utils.print_progress(f"Output language: {cfg.get('output_language')}")
-        utils.print_progress(f"Minimum comment length: {cfg.get('min_length')}")
-        utils.print_progress(f"Batch size: {cfg.get('batch_size')}")
-        utils.print_progress(f"Max comments per video: {cfg.get('max_comments')}")
-        utils.print_progress(f"Max video workers: {cfg.get('max_video_workers')}")
-        utils.print_progress(f"Max batch workers: {cfg.get('max_batch_workers')}")
-        utils.print_progress(f"Use cache: {cfg.get('use_cache')}")
-        utils.print_progress(f"Analyze audience: {cfg.get('analyze_audience')}")
+        utils.print_progress(f"Analysis model: {settings.analysis_model}")
+        utils.print_progress(f"Filter language: {settings.filter_language or 'all languages'}")
+        utils.print_progress(f"Output language: {settings.output_language}")
+        utils.print_progress(f"Minimum comment length: {settings.min_length}")
+        utils.print_progress(f"Batch size: {settings.batch_size}")
+        utils.print_progress(f"Max comments per video: {settings.max_comments}")
+        utils.print_progress(f"Max video workers: {settings.max_video_workers}")
+        utils.print_progress(f"Executor kind: {settings.executor_kind}")
+        utils.print_progress(f"Max batch workers: {settings.max_batch_workers}")
+        utils.print_progress(f"Use cache: {settings.use_cache}")
+        utils.print_progress(f"Analyze audience: {settings.analyze_audience}")
     except Exception as e:
         utils.print_error(f"Error loading configuration: {e}")
         return
@@ -4,47 +4,102 @@ Analyzes comments for one video and saves results to cache.
 """
 
 import os
-import json
+import re
+import time
+import asyncio
 import hashlib
+import functools
 import pandas as pd
-from typing import Any, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional, Sequence
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import islice
+
+import httpx
+from openai import OpenAI
+from pydantic import BaseModel
+from langchain_openai import ChatOpenAI
+
+try:
+    import xxhash
+except ImportError:  # xxhash is optional, fall back to blake2b
+    xxhash = None
 
 import config
 from src import utils, prompts
+from src.logger import logger
 from src.audience_analysis import analyze_video_audience
 
-def load_comments_from_file(file_path: str) -> list[dict]:
-    """Load comments from a JSON file (one JSON object per line)."""
-    comments = []
+# Matches comments made up of nothing but URLs (see utils.is_url_only)
+_URL_ONLY_RE = re.compile(r'\s*(?:https?://\S+\s*)+')
+
+# The JSON array of per-comment results in a batch response
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+# Retries (with exponential backoff) for rate-limited or failed LLM requests
+LLM_MAX_RETRIES = 5
+
+# How often to poll a running OpenAI Batch API job
+BATCH_API_POLL_SECONDS = 30
+
+# Prompt tokens spent on the "COMMENT n:" header and fences around each comment
+COMMENT_WRAPPER_TOKENS = 12
+
+# Most comments packed into one token-budgeted batch; keeps the JSON response short enough to complete
+MAX_PACKED_BATCH_COMMENTS = 50
+
+# 64-bit hash for cache keys (16 hex chars); not security sensitive, so xxh3 when available
+if xxhash is not None:
+    _new_cache_hash = xxhash.xxh3_64
+else:
+    _new_cache_hash = functools.partial(hashlib.blake2b, digest_size=8)
+
+# Config parameters (with defaults) that affect a video's analysis, in cache key order
+_CACHE_KEY_ORDER = (
+    ('analysis_model', None),
+    ('min_length', None),
+    ('filter_language', None),
+    ('batch_size', None),
+    ('target_in_tokens', None),
+    ('max_comments', None),
+    ('cache_version', '1.0'),
+    ('analyze_audience', False),
+    ('language_analysis', False),
+)
+
+# Config parameters that must match for a cached run's per-comment results to be reused
+_SUPERSET_KEYS = (
+    ('analysis_model', None),
+    ('filter_language', None),
+    ('min_length', None),
+    ('cache_version', '1.0'),
+)
+
+def load_comment_texts(file_path: str, data: Optional[bytes] = None) -> list[Optional[str]]:
+    """Load comment texts from a JSON file (one JSON object per line).
+
+    Only the text field is used downstream, so each record is reduced to it while
+    parsing instead of keeping every comment dict in memory. Records without text
+    yield None. If data is given it is parsed as the already-read file contents.
+    """
+    texts = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    comment = json.loads(line)
-                    comments.append(comment)
+        if data is None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        texts = [config.loads(line).get('text') for line in data.splitlines() if line.strip()]
     except Exception as e:
         utils.print_error(f"Error loading comments from {file_path}: {e}")
-    return comments
+    return texts
 
 
 def get_cache_key(video_id: str, config: dict[str, Any]) -> str:
     """Generate cache key based on video ID and relevant config parameters."""
-    cache_params = {
-        'video_id': video_id,
-        'analysis_model': config.get('analysis_model'),
-        'min_length': config.get('min_length'),
-        'filter_language': config.get('filter_language'),
-        'batch_size': config.get('batch_size'),
-        'max_comments': config.get('max_comments'),
-        'cache_version': config.get('cache_version', '1.0'),
-        'analyze_audience': config.get('analyze_audience', False),
-        'language_analysis': config.get('language_analysis', False)
-    }
-    
-    cache_string = json.dumps(cache_params, sort_keys=True)
-    return hashlib.md5(cache_string.encode()).hexdigest()[:16]
+    h = _new_cache_hash(video_id.encode())
+    for key, default in _CACHE_KEY_ORDER:
+        h.update(b'\x00')
+        h.update(repr(config.get(key, default)).encode())
+    return h.hexdigest()
 
 
 def get_cache_path(video_id: str, cache_key: str) -> str:
@@ -52,18 +107,18 @@ def get_cache_path(video_id: str, cache_key: str) -> str:
     return config.get_analysis_file_path(video_id).parent / f"{video_id}_{cache_key}.json"
 
 
-def load_cached_analysis(video_id: str, config: dict[str, Any]) -> Optional[dict[str, Any]]:
+def load_cached_analysis(video_id: str, config_dict: dict[str, Any]) -> Optional[dict[str, Any]]:
     """Load cached analysis if available and valid."""
-    if not config.get('use_cache', True):
+    if not config_dict.get('use_cache', True):
         return None
     
-    cache_key = get_cache_key(video_id, config)
+    cache_key = get_cache_key(video_id, config_dict)
     cache_path = get_cache_path(video_id, cache_key)
     
     if os.path.exists(cache_path):
         try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
+            with open(cache_path, 'rb') as f:
+                cached_data = config.loads(f.read())
             utils.print_success(f"Loaded cached analysis for video {video_id}")
             return cached_data
         except Exception as e:
@@ -72,6 +127,47 @@ def load_cached_analysis(video_id: str, config: dict[str, Any]) -> Optional[dict
     return None
 
 
+def has_cached_analysis(video_id: str, config_dict: dict[str, Any]) -> bool:
+    """Check whether load_cached_analysis would find a cache file, without reading it."""
+    return (bool(config_dict.get('use_cache', True))
+            and os.path.exists(get_cache_path(video_id, get_cache_key(video_id, config_dict))))
+
+
+def load_superset_analysis(video_id: str, config_dict: dict[str, Any],
+                           filtered_count: int) -> Optional[list[dict[str, Any]]]:
+    """Reuse per-comment results from a cached run that analyzed at least as many comments.
+
+    A cached analysis is compatible when it used the same model, language filter, minimum
+    length and cache version, and a max_comments at least as large as requested. Since the
+    filtered comments are processed in order, its first max_comments results cover this run,
+    provided it kept exactly one valid result per comment: failed comments are dropped from
+    analyzed_comments, which would shift the later results, so such runs are not reused.
+    """
+    if not config_dict.get('use_cache', True):
+        return None
+    
+    max_comments = config_dict.get('max_comments', 1000)
+    for cache_path in config.ANALYSIS_DIR.glob(f"{video_id}_*.json"):
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_data = config.loads(f.read())
+        except Exception:
+            continue
+        
+        used = cached_data.get('config_used') or {}
+        cached_max_comments = used.get('max_comments') or 0
+        analyzed_comments = cached_data.get('analyzed_comments') or []
+        if (cached_data.get('video_id') == video_id
+                and all(used.get(key) == config_dict.get(key, default) for key, default in _SUPERSET_KEYS)
+                and cached_max_comments >= max_comments
+                and len(analyzed_comments) == min(filtered_count, cached_max_comments)
+                and not any('error' in comment for comment in analyzed_comments)):
+            utils.print_success(f"Reusing cached analysis {cache_path.name} for video {video_id}")
+            return analyzed_comments[:max_comments]
+    
+    return None
+
+
 def save_analysis_to_cache(video_id: str, analysis_data: dict[str, Any], config_dict: dict[str, Any]) -> None:
     """Save analysis results to cache."""
     if not config_dict.get('use_cache', True):
@@ -83,67 +179,106 @@ def save_analysis_to_cache(video_id: str, analysis_data: dict[str, Any], config_
     config.ANALYSIS_DIR.mkdir(parents=True, exist_ok=True)
     
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(analysis_data, f, indent=2, ensure_ascii=False)
+        payload = config.dumps(analysis_data)
+        with open(cache_path, 'wb') as f:
+            f.write(payload)
         utils.print_success(f"Saved analysis to cache: {os.path.basename(cache_path)}")
     except Exception as e:
         utils.print_warning(f"Error saving analysis to cache: {e}")
 
 
+@functools.lru_cache(maxsize=100_000)
+def _detect_language_cached(text: str) -> str:
+    """Detect language once per distinct text; the cache is shared across videos."""
+    return utils.detect_language_safe(text)
+
+
 def preprocess_and_filter_comments(df_comments: pd.DataFrame, filter_language: Optional[str], min_length: int) -> pd.DataFrame:
     """Preprocess and filter comments based on language and length criteria."""
     if df_comments.empty or 'text' not in df_comments.columns:
         return pd.DataFrame()
     
-    # Filter by length
-    filtered_df = df_comments.copy()
-    filtered_df = filtered_df[filtered_df['text'].str.len() >= min_length]
-    
-    # Filter out URL-only comments
-    filtered_df = filtered_df[~filtered_df['text'].apply(utils.is_url_only)]
+    # Length and URL-only checks run as vectorized kernels on an Arrow-backed copy of the text.
+    # Non-string values are masked to NA first (the cast would stringify them), so missing
+    # or non-string text fails both checks
+    raw_texts = df_comments['text']
+    texts = raw_texts.where(raw_texts.map(lambda text: isinstance(text, str))).astype('string[pyarrow]')
+    long_enough = texts.str.len().ge(min_length).fillna(False)
+    url_only = texts.str.fullmatch(_URL_ONLY_RE.pattern).fillna(True)
+    filtered_df = df_comments[(long_enough & ~url_only).to_numpy(dtype=bool)]
     
     # Filter by language if specified
     if filter_language:
-        filtered_df['detected_language'] = filtered_df['text'].apply(utils.detect_language_safe)
-        filtered_df = filtered_df[filtered_df['detected_language'] == filter_language]
+        # Short comments repeat a lot ("nice video", "first"), so detect per distinct text
+        texts = filtered_df['text']
+        language_by_text = {text: _detect_language_cached(text) for text in pd.unique(texts.to_numpy())}
+        filtered_df = filtered_df[texts.map(language_by_text) == filter_language]
     
     return filtered_df
 
 
-def analyze_comments_batch(comments_batch: list[str], model_name: str, min_length: int, 
-                         enable_fallback: bool = True) -> list[Optional[dict[str, Any]]]:
-    """Analyze multiple comments in a single LLM call for better performance."""
-    from langchain_openai import ChatOpenAI
-    from pydantic import BaseModel
-    import re
-    
-    class CommentAnalysis(BaseModel):
-        sentiment: str
-        topics: list[str]
-        pain_points: list[str]
-        advantages: list[str]
-        recommendations_for_creator: list[str]
-        is_relevant_feedback: bool
-    
-    # Filter and prepare comments
+class CommentAnalysis(BaseModel):
+    sentiment: str
+    topics: list[str]
+    pain_points: list[str]
+    advantages: list[str]
+    recommendations_for_creator: list[str]
+    is_relevant_feedback: bool
+
+
+_COMMENT_FIELDS = tuple(CommentAnalysis.model_fields)
+_COMMENT_LIST_FIELDS = ('topics', 'pain_points', 'advantages', 'recommendations_for_creator')
+
+# Shared results for comments that are skipped or only get the fallback analysis.
+# Downstream code only reads analyzed comments, so one instance serves every comment.
+_SKIPPED_COMMENT_RESULT = {
+    "sentiment": "neutral", "topics": [], "pain_points": [],
+    "advantages": [], "recommendations_for_creator": [], "is_relevant_feedback": False,
+}
+_FALLBACK_COMMENT_RESULT = {
+    "sentiment": "neutral", "topics": ["general"], "pain_points": [],
+    "advantages": [], "recommendations_for_creator": [], "is_relevant_feedback": True,
+}
+
+
+def _validate_comment_analysis(data: Any) -> dict[str, Any]:
+    """Check one LLM result has the CommentAnalysis fields and shapes, without a pydantic round-trip."""
+    if not isinstance(data, dict):
+        raise ValueError(f"expected an object, got {type(data).__name__}")
+    missing = [field for field in _COMMENT_FIELDS if field not in data]
+    if missing:
+        raise ValueError(f"missing fields: {', '.join(missing)}")
+    if (not isinstance(data['sentiment'], str) or not isinstance(data['is_relevant_feedback'], bool)
+            or not all(isinstance(data[field], list) for field in _COMMENT_LIST_FIELDS)):
+        raise ValueError("unexpected field types")
+    return {field: data[field] for field in _COMMENT_FIELDS}
+
+
+# The batch prompt split around the comments; each half is formatted once per comment count
+_BATCH_PROMPT_HEAD, _BATCH_PROMPT_TAIL = prompts.BATCH_COMMENT_ANALYSIS_PROMPT.split("{comments_text}")
+
+
+@functools.lru_cache(maxsize=256)
+def _batch_prompt_frame(comment_count: int) -> tuple[str, str]:
+    """Get the batch prompt text before and after the comments for a batch of comment_count comments."""
+    return (_BATCH_PROMPT_HEAD.format(comment_count=comment_count),
+            _BATCH_PROMPT_TAIL.format(comment_count=comment_count))
+
+
+def _prepare_batch(comments_batch: list[str], min_length: int) -> tuple[list[Optional[dict[str, Any]]], list[tuple[int, str]], str]:
+    """Split a batch into placeholder results, the comments worth sending and the prompt for them."""
     valid_comments = []
     results: list[Optional[dict[str, Any]]] = []
     
     for i, comment_text in enumerate(comments_batch):
         if not comment_text or not isinstance(comment_text, str) or len(comment_text.strip()) < min_length:
-            results.append(CommentAnalysis(
-                sentiment="neutral", topics=[], pain_points=[], 
-                advantages=[], recommendations_for_creator=[], is_relevant_feedback=False
-            ).model_dump())
+            results.append(_SKIPPED_COMMENT_RESULT)
         else:
             valid_comments.append((i, comment_text))
             results.append(None)
     
     if not valid_comments:
-        return results
-    
-    # Prepare LLM analysis
-    llm = ChatOpenAI(model=model_name, temperature=0)
+        return results, valid_comments, ""
     
     comments_for_analysis = "\n\n".join([
         f"COMMENT {i+1}:\n```\n{comment}\n```" 
@@ -151,31 +286,44 @@ def analyze_comments_batch(comments_batch: list[str], model_name: str, min_lengt
     ])
     
     # Use centralized prompt
-    batch_prompt = prompts.BATCH_COMMENT_ANALYSIS_PROMPT.format(
-        comment_count=len(valid_comments),
-        comments_text=comments_for_analysis
-    )
+    prompt_head, prompt_tail = _batch_prompt_frame(len(valid_comments))
+    batch_prompt = f"{prompt_head}{comments_for_analysis}{prompt_tail}"
+    return results, valid_comments, batch_prompt
+
+
+def _apply_batch_response(response_text: str, results: list[Optional[dict[str, Any]]],
+                          valid_comments: list[tuple[int, str]]) -> bool:
+    """Parse the LLM's JSON array into results. Returns False if no array was found."""
+    json_match = _JSON_ARRAY_RE.search(response_text)
+    if not json_match:
+        return False
+    
+    batch_results = config.loads(json_match.group())
+    
+    # Map results back to original positions
+    for (original_idx, _), analysis_data in zip(valid_comments, batch_results):
+        try:
+            results[original_idx] = _validate_comment_analysis(analysis_data)
+        except Exception as e:
+            utils.print_warning(f"Error parsing analysis for comment {original_idx}: {e}")
+            results[original_idx] = None
+    return True
+
+
+async def analyze_comments_batch(llm, comments_batch: list[str], min_length: int,
+                                 enable_fallback: bool = True) -> list[Optional[dict[str, Any]]]:
+    """Analyze multiple comments in a single LLM call for better performance."""
+    results, valid_comments, batch_prompt = _prepare_batch(comments_batch, min_length)
+    if not valid_comments:
+        return results
     
     try:
-        response = llm.invoke([{"role": "user", "content": batch_prompt}])
+        response = await llm.ainvoke([{"role": "user", "content": batch_prompt}])
         response_text = str(response.content if hasattr(response, 'content') else response)
         
-        # Extract and parse JSON response
-        json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-        if json_match:
-            batch_results = json.loads(json_match.group())
-            
-            # Map results back to original positions
-            for (original_idx, _), analysis_data in zip(valid_comments, batch_results):
-                try:
-                    analysis = CommentAnalysis(**analysis_data)
-                    results[original_idx] = analysis.model_dump()
-                except Exception as e:
-                    utils.print_warning(f"Error parsing analysis for comment {original_idx}: {e}")
-                    results[original_idx] = None
-        else:
+        if not _apply_batch_response(response_text, results, valid_comments):
             if enable_fallback:
-                return analyze_comments_fallback(comments_batch, model_name, min_length)
+                return analyze_comments_fallback(comments_batch, llm.model_name, min_length)
             else:
                 for original_idx, _ in valid_comments:
                     results[original_idx] = None
@@ -183,7 +331,7 @@ def analyze_comments_batch(comments_batch: list[str], model_name: str, min_lengt
     except Exception as e:
         utils.print_warning(f"Error in batch analysis: {e}")
         if enable_fallback:
-            return analyze_comments_fallback(comments_batch, model_name, min_length)
+            return analyze_comments_fallback(comments_batch, llm.model_name, min_length)
         else:
             for original_idx, _ in valid_comments:
                 results[original_idx] = None
@@ -191,84 +339,211 @@ def analyze_comments_batch(comments_batch: list[str], model_name: str, min_lengt
     return results
 
 
+@functools.lru_cache(maxsize=1)
+def _get_openai_client() -> OpenAI:
+    """Get the (synchronous) OpenAI client used for Batch API jobs, shared by all videos."""
+    return OpenAI(max_retries=LLM_MAX_RETRIES)
+
+
+def analyze_comments_batchapi(all_batches: list[list[str]], model_name: str, min_length: int,
+                              enable_fallback: bool = True,
+                              poll_interval: float = BATCH_API_POLL_SECONDS) -> list[list[Optional[dict[str, Any]]]]:
+    """Analyze all batches as a single OpenAI Batch API job (cheaper, for offline runs).
+
+    Uploads one chat-completions request per batch, waits for the job to finish
+    and maps the responses back by custom_id. Returns one result list per batch.
+    """
+    client = _get_openai_client()
+    prepared = [_prepare_batch(batch, min_length) for batch in all_batches]
+    
+    request_lines = [
+        config.dumps_line({
+            "custom_id": f"b{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model_name,
+                "temperature": 0,
+                "messages": [{"role": "user", "content": batch_prompt}],
+            },
+        })
+        for i, (_, valid_comments, batch_prompt) in enumerate(prepared) if valid_comments
+    ]
+    
+    responses: dict[str, str] = {}
+    if request_lines:
+        batch_file = client.files.create(file=("batch.jsonl", b"\n".join(request_lines)), purpose="batch")
+        job = client.batches.create(input_file_id=batch_file.id, endpoint="/v1/chat/completions",
+                                    completion_window="24h")
+        utils.print_progress(f"Submitted Batch API job {job.id} with {len(request_lines)} requests")
+        
+        while job.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            job = client.batches.retrieve(job.id)
+        
+        if job.status != "completed":
+            utils.print_warning(f"Batch API job {job.id} finished with status '{job.status}'")
+        if job.output_file_id:
+            for line in client.files.content(job.output_file_id).content.splitlines():
+                if not line.strip():
+                    continue
+                item = config.loads(line)
+                body = (item.get("response") or {}).get("body") or {}
+                choices = body.get("choices") or []
+                if choices:
+                    responses[item["custom_id"]] = choices[0]["message"]["content"] or ""
+    
+    all_results = []
+    for i, (results, valid_comments, _) in enumerate(prepared):
+        if valid_comments:
+            response_text = responses.get(f"b{i}")
+            try:
+                parsed = response_text is not None and _apply_batch_response(response_text, results, valid_comments)
+            except Exception as e:
+                utils.print_warning(f"Error in batch analysis: {e}")
+                parsed = False
+            if not parsed:
+                if enable_fallback:
+                    results = analyze_comments_fallback(all_batches[i], model_name, min_length)
+                else:
+                    for original_idx, _ in valid_comments:
+                        results[original_idx] = None
+        all_results.append(results)
+    return all_results
+
+
 def analyze_comments_fallback(comments_batch: list[str], model_name: str, min_length: int) -> list[Optional[dict[str, Any]]]:
     """Fallback to single comment analysis if batch fails."""
     utils.print_progress(f"Using fallback single-comment analysis for {len(comments_batch)} comments...")
     
-    from pydantic import BaseModel
-    
-    class CommentAnalysis(BaseModel):
-        sentiment: str
-        topics: list[str]
-        pain_points: list[str]
-        advantages: list[str]
-        recommendations_for_creator: list[str]
-        is_relevant_feedback: bool
-    
     results = []
     for comment_text in comments_batch:
         if not comment_text or len(comment_text.strip()) < min_length:
-            results.append(CommentAnalysis(
-                sentiment="neutral", topics=[], pain_points=[], 
-                advantages=[], recommendations_for_creator=[], is_relevant_feedback=False
-            ).model_dump())
+            results.append(_SKIPPED_COMMENT_RESULT)
         else:
             # Simple fallback analysis
-            results.append(CommentAnalysis(
-                sentiment="neutral", topics=["general"], pain_points=[], 
-                advantages=[], recommendations_for_creator=[], is_relevant_feedback=True
-            ).model_dump())
+            results.append(_FALLBACK_COMMENT_RESULT)
     
     return results
 
 
-def process_video_batches_parallel(comment_texts: list[str], config: dict[str, Any]) -> list[dict[str, Any]]:
-    """Process comment batches in parallel for a single video."""
-    batch_size = config.get('batch_size', 20)
-    max_workers = config.get('max_batch_workers', 2)
-    model_name = config['analysis_model']
-    min_length = config.get('min_length', 10)
-    enable_fallback = config.get('enable_fallback', True)
+@functools.lru_cache(maxsize=8)
+def _get_encoding(model_name: str):
+    """Get the tiktoken encoding for a model (o200k_base for models tiktoken doesn't know).
+
+    Returns None if the encoding cannot be loaded (e.g. tiktoken cannot download it offline).
+    """
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        utils.print_warning(f"Token encoding unavailable, batching by batch_size instead: {e}")
+        return None
+
+
+def pack_batches_by_tokens(comment_texts: Sequence[str], model_name: str, target_in_tokens: int) -> list[tuple[int, list[str]]]:
+    """Greedily pack consecutive comments into batches of at most target_in_tokens prompt tokens.
+
+    Every batch holds at least one comment, so an oversized comment gets a batch of its own,
+    and at most MAX_PACKED_BATCH_COMMENTS comments.
+    """
+    enc = _get_encoding(model_name)
+    # The prompt frame mentions the batch's comment count; size it for the largest batch
+    preamble = "".join(_batch_prompt_frame(MAX_PACKED_BATCH_COMMENTS))
+    budget = target_in_tokens - len(enc.encode_ordinary(preamble))
+    token_counts = [len(tokens) for tokens in enc.encode_ordinary_batch(comment_texts)]
     
-    # Create batches
     batches = []
-    for i in range(0, len(comment_texts), batch_size):
-        batch_end = min(i + batch_size, len(comment_texts))
-        batch_comments = comment_texts[i:batch_end]
-        batches.append((i, batch_comments))
-    
-    utils.print_progress(f"Processing {len(comment_texts)} comments in {len(batches)} batches using {max_workers} workers...")
-    
-    all_results: list[Optional[dict[str, Any]]] = [None] * len(comment_texts)
-    
-    # Process batches in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_batch = {
-            executor.submit(analyze_comments_batch, batch_comments, model_name, min_length, enable_fallback): (batch_start, batch_comments)
-            for batch_start, batch_comments in batches
-        }
-        
-        for future in as_completed(future_to_batch):
-            batch_start, batch_comments = future_to_batch[future]
+    batch_start = 0
+    used = 0
+    for i, count in enumerate(token_counts):
+        cost = count + COMMENT_WRAPPER_TOKENS
+        if i > batch_start and (used + cost > budget or i - batch_start >= MAX_PACKED_BATCH_COMMENTS):
+            batches.append((batch_start, list(comment_texts[batch_start:i])))
+            batch_start, used = i, 0
+        used += cost
+    if batch_start < len(comment_texts):
+        batches.append((batch_start, list(comment_texts[batch_start:])))
+    return batches
+
+
+async def _process_batches_async(batches: list[tuple[int, list[str]]], all_results: list[Optional[dict[str, Any]]],
+                                 model_name: str, max_workers: int, min_length: int, enable_fallback: bool) -> None:
+    """Run all batches on one event loop, with at most max_workers LLM requests in flight."""
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def run(batch_num: int, batch_start: int, batch_comments: list[str]) -> None:
+        async with semaphore:
             try:
-                batch_results = future.result()
+                batch_results = await analyze_comments_batch(llm, batch_comments, min_length, enable_fallback)
                 
                 # Place results in correct positions
-                for i, result in enumerate(batch_results):
-                    all_results[batch_start + i] = result
+                all_results[batch_start:batch_start + len(batch_results)] = batch_results
                 
-                batch_num = next(i for i, (start, _) in enumerate(batches) if start == batch_start) + 1
                 utils.print_progress(f"Completed batch {batch_num}/{len(batches)}")
                 
             except Exception as e:
                 utils.print_error(f"Error processing batch starting at {batch_start}: {e}")
                 # Fill with error results
-                for i in range(len(batch_comments)):
-                    all_results[batch_start + i] = {"error": f"Batch processing failed: {e}"}
+                error_result = {"error": f"Batch processing failed: {e}"}
+                all_results[batch_start:batch_start + len(batch_comments)] = [error_result] * len(batch_comments)
+
+    # Each call gets its own event loop, so it also gets its own HTTP client;
+    # the OpenAI client retries rate-limited and failed requests with backoff.
+    async with httpx.AsyncClient() as http_client:
+        llm = ChatOpenAI(model=model_name, temperature=0, max_retries=LLM_MAX_RETRIES,
+                         http_async_client=http_client)
+        await asyncio.gather(*(run(batch_num, batch_start, batch_comments)
+                               for batch_num, (batch_start, batch_comments) in enumerate(batches, 1)))
+
+
+def make_comment_batches(comment_texts: Sequence[str], config: dict[str, Any]) -> list[tuple[int, list[str]]]:
+    """Split comments into (start index, comments) batches, by token budget or by batch_size.
+
+    comment_texts may be a list or a numpy object array; batches are sliced off as lists.
+    """
+    batch_size = config.get('batch_size', 20)
+    model_name = config['analysis_model']
+    
+    target_in_tokens = config.get('target_in_tokens')
+    if target_in_tokens and _get_encoding(model_name) is not None:
+        return pack_batches_by_tokens(comment_texts, model_name, target_in_tokens)
     
+    batches = []
+    for i in range(0, len(comment_texts), batch_size):
+        batch_end = min(i + batch_size, len(comment_texts))
+        batch_comments = list(comment_texts[i:batch_end])
+        batches.append((i, batch_comments))
+    return batches
+
+
+def _drop_failed_results(all_results: list[Optional[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """Drop the comments whose analysis failed (None)."""
+    # Usually every slot is filled; only build a new list when some comments failed
+    if None not in all_results:
+        return all_results
     return [result for result in all_results if result is not None]
 
 
+def process_video_batches_parallel(comment_texts: Sequence[str], config: dict[str, Any]) -> list[dict[str, Any]]:
+    """Process comment batches concurrently for a single video."""
+    max_workers = config.get('max_batch_workers', 2)
+    model_name = config['analysis_model']
+    min_length = config.get('min_length', 10)
+    enable_fallback = config.get('enable_fallback', True)
+    
+    batches = make_comment_batches(comment_texts, config)
+    
+    utils.print_progress(f"Processing {len(comment_texts)} comments in {len(batches)} batches with up to {max_workers} concurrent requests...")
+    
+    all_results: list[Optional[dict[str, Any]]] = [None] * len(comment_texts)
+    asyncio.run(_process_batches_async(batches, all_results, model_name, max_workers, min_length, enable_fallback))
+    return _drop_failed_results(all_results)
+
+
 def aggregate_video_analysis(video_id: str, analyzed_comments: list[dict[str, Any]], 
                            top_n_topics: int = 5, top_n_pain_points: int = 5, 
                            top_n_advantages: int = 5) -> dict[str, Any]:
@@ -278,19 +553,39 @@ def aggregate_video_analysis(video_id: str, analyzed_comments: list[dict[str, An
     from collections import Counter
     from typing import Union
     
-    relevant_comments = [
-        comment for comment in analyzed_comments 
-        if comment.get('is_relevant_feedback', False) and not comment.get('error')
-    ]
-    
-    all_valid_comments = [
-        comment for comment in analyzed_comments if not comment.get('error')
-    ]
+    # Single pass over the comments, updating every accumulator at once
+    sentiment_counts: Counter = Counter()
+    topic_counts: Counter = Counter()
+    pain_point_counts: Counter = Counter()
+    advantage_counts: Counter = Counter()
+    recommendations: dict[str, str] = {}  # normalized text -> first spelling seen, in order
+    relevant_count = 0
+    
+    for comment in analyzed_comments:
+        if comment.get('error'):
+            continue
+        if 'sentiment' in comment:
+            sentiment_counts[comment['sentiment']] += 1
+        if not comment.get('is_relevant_feedback', False):
+            continue
+        
+        relevant_count += 1
+        topic_counts.update(topic.lower().strip() for topic in comment.get('topics') or ()
+                            if topic and isinstance(topic, str))
+        pain_point_counts.update(point.lower().strip() for point in comment.get('pain_points') or ()
+                                 if point and isinstance(point, str))
+        advantage_counts.update(adv.lower().strip() for adv in comment.get('advantages') or ()
+                                if adv and isinstance(adv, str))
+        for rec in comment.get('recommendations_for_creator') or ():
+            if rec and isinstance(rec, str):
+                # Treat recommendations differing only in case or trailing punctuation as one
+                rec = rec.strip()
+                key = rec.casefold().rstrip('.!?,;: ')
+                if key:
+                    recommendations.setdefault(key, rec)
 
     # 1. Sentiment Summary
-    sentiments = [comment['sentiment'] for comment in all_valid_comments if 'sentiment' in comment]
-    sentiment_counts = Counter(sentiments)
-    total_sentiments = len(sentiments)
+    total_sentiments = sentiment_counts.total()
     
     sentiment_summary: dict[str, Union[int, float]] = {
         f"{s}_count": sentiment_counts.get(s, 0) for s in ['positive', 'neutral', 'negative']
@@ -304,45 +599,16 @@ def aggregate_video_analysis(video_id: str, analyzed_comments: list[dict[str, An
         for s_type in ['positive', 'neutral', 'negative']:
             sentiment_summary[f"{s_type}_percentage"] = 0.0
 
-    # 2. Topics Aggregation
-    all_topics = []
-    for comment in relevant_comments:
-        topics = comment.get('topics', [])
-        if topics:
-             all_topics.extend(topic.lower().strip() for topic in topics if topic and isinstance(topic, str))
-    topic_counts = Counter(all_topics)
+    # 2. Topics, pain points, advantages and creator recommendations
     top_topics = [{"topic": topic, "count": count} for topic, count in topic_counts.most_common(top_n_topics)]
-
-    # 3. Pain Points Aggregation
-    all_pain_points = []
-    for comment in relevant_comments:
-        points = comment.get('pain_points', [])
-        if points:
-            all_pain_points.extend(point.lower().strip() for point in points if point and isinstance(point, str))
-    pain_point_counts = Counter(all_pain_points)
     common_pain_points = [{"point": point, "count": count} for point, count in pain_point_counts.most_common(top_n_pain_points)]
-
-    # 4. Advantages Aggregation
-    all_advantages = []
-    for comment in relevant_comments:
-        advantages = comment.get('advantages', [])
-        if advantages:
-            all_advantages.extend(adv.lower().strip() for adv in advantages if adv and isinstance(adv, str))
-    advantage_counts = Counter(all_advantages)
     highlighted_advantages = [{"advantage": advantage, "count": count} for advantage, count in advantage_counts.most_common(top_n_advantages)]
-
-    # 5. Creator Recommendations Aggregation
-    all_recommendations = []
-    for comment in relevant_comments:
-        recommendations = comment.get('recommendations_for_creator', [])
-        if recommendations:
-            all_recommendations.extend(rec.strip() for rec in recommendations if rec and isinstance(rec, str))
-    unique_recommendations = list(dict.fromkeys(all_recommendations))
+    unique_recommendations = list(recommendations.values())
 
     return {
         "video_url_or_id": video_id,
         "total_comments_processed": len(analyzed_comments),
-        "relevant_comments_count": len(relevant_comments),
+        "relevant_comments_count": relevant_count,
         "sentiment_summary": sentiment_summary,
         "top_topics": top_topics,
         "common_pain_points": common_pain_points,
@@ -351,25 +617,22 @@ def aggregate_video_analysis(video_id: str, analyzed_comments: list[dict[str, An
     }
 
 
-def analyze_single_video(video_id: str, video_url: str, comment_file: str, config: dict[str, Any]) -> Optional[dict[str, Any]]:
-    """Analyze comments for a single video with caching support."""
-    print(f"\n--- Processing Video: {video_id} ---")
-    utils.print_progress(f"URL: {video_url}")
-    
-    # Check cache first
-    cached_analysis = load_cached_analysis(video_id, config)
-    if cached_analysis:
-        return cached_analysis
-    
+def load_filtered_comments(video_id: str, comment_file: str, config: dict[str, Any],
+                           comment_data: Optional[bytes] = None) -> Optional[tuple[list[Optional[str]], Sequence[str], int]]:
+    """Load and filter a video's comments.
+
+    Returns all comment texts, the texts to analyze (at most max_comments) and the number of
+    comments that passed the filters, or None if there is nothing to analyze.
+    """
     # Load and process comments
     try:
-        comments = load_comments_from_file(comment_file)
-        if not comments:
+        comment_texts = load_comment_texts(comment_file, comment_data)
+        if not comment_texts:
             utils.print_error(f"No comments loaded for video {video_id}")
             return None
         
-        df_comments = pd.DataFrame(comments)
-        utils.print_success(f"Loaded {len(comments)} comments")
+        df_comments = pd.DataFrame({'text': comment_texts})
+        utils.print_success(f"Loaded {len(comment_texts)} comments")
     except Exception as e:
         utils.print_error(f"Error loading comments: {e}")
         return None
@@ -391,18 +654,14 @@ def analyze_single_video(video_id: str, video_url: str, comment_file: str, confi
         utils.print_error(f"No comments remaining after filtering for video {video_id}")
         return None
     
-    # Analyze comments
     max_comments = config.get('max_comments', 1000)
-    comments_to_process = filtered_df.head(max_comments)
-    comment_texts = comments_to_process['text'].tolist()
-    
-    try:
-        analyzed_comments = process_video_batches_parallel(comment_texts, config)
-        utils.print_success(f"Analyzed {len(analyzed_comments)} comments")
-    except Exception as e:
-        utils.print_error(f"Error analyzing comments: {e}")
-        return None
-    
+    texts_to_process = filtered_df.head(max_comments)['text'].to_numpy()
+    return comment_texts, texts_to_process, len(filtered_df)
+
+
+def build_video_result(video_id: str, video_url: str, comment_texts: list[Optional[str]],
+                       analyzed_comments: list[dict[str, Any]], config: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """Summarize a video's analyzed comments, add the audience analysis and cache the result."""
     # Generate summary and audience analysis
     try:
         video_summary = aggregate_video_analysis(video_id, analyzed_comments)
@@ -415,7 +674,7 @@ def analyze_single_video(video_id: str, video_url: str, comment_file: str, confi
     audience_analysis = None
     if config.get('analyze_audience', False) or config.get('language_analysis', False):
         try:
-            audience_analysis = analyze_video_audience(video_id, comments, analyzed_comments, config)
+            audience_analysis = analyze_video_audience(video_id, comment_texts, analyzed_comments, config)
             utils.print_success("Completed audience analysis")
         except Exception as e:
             utils.print_error(f"Error in audience analysis: {e}")
@@ -432,9 +691,10 @@ def analyze_single_video(video_id: str, video_url: str, comment_file: str, confi
             'filter_language': config.get('filter_language'),
             'min_length': config.get('min_length'),
             'max_comments': config.get('max_comments'),
-            'batch_size': config.get('batch_size')
+            'batch_size': config.get('batch_size'),
+            'cache_version': config.get('cache_version', '1.0')
         },
-        'analysis_timestamp': pd.Timestamp.now().isoformat()
+        'analysis_timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')
     }
     
     # Save to cache
@@ -443,36 +703,147 @@ def analyze_single_video(video_id: str, video_url: str, comment_file: str, confi
     return result
 
 
+def analyze_single_video(video_id: str, video_url: str, comment_file: str, config: dict[str, Any],
+                         comment_data: Optional[bytes] = None) -> Optional[dict[str, Any]]:
+    """Analyze comments for a single video with caching support.
+
+    comment_data may hold the prefetched contents of comment_file.
+    """
+    logger.info(f"\n--- Processing Video: {video_id} ---")
+    utils.print_progress(f"URL: {video_url}")
+    
+    # Check cache first
+    cached_analysis = load_cached_analysis(video_id, config)
+    if cached_analysis:
+        return cached_analysis
+    
+    loaded = load_filtered_comments(video_id, comment_file, config, comment_data)
+    if loaded is None:
+        return None
+    comment_texts, texts_to_process, filtered_count = loaded
+    
+    # Analyze comments
+    try:
+        analyzed_comments = load_superset_analysis(video_id, config, filtered_count)
+        if analyzed_comments is None:
+            analyzed_comments = process_video_batches_parallel(texts_to_process, config)
+        utils.print_success(f"Analyzed {len(analyzed_comments)} comments")
+    except Exception as e:
+        utils.print_error(f"Error analyzing comments: {e}")
+        return None
+    
+    return build_video_result(video_id, video_url, comment_texts, analyzed_comments, config)
+
+
+def analyze_videos_batchapi(targets: list[tuple[str, str, str]],
+                            config_dict: dict[str, Any]) -> dict[str, Optional[dict[str, Any]]]:
+    """Analyze several videos with a single OpenAI Batch API job (cheaper, for offline runs).
+
+    Every uncached video is loaded, filtered and split into batches first; the batches of
+    all videos go into one job, and the responses are fanned back out per video.
+    targets holds (video_id, video_url, comment_file) tuples; results are keyed by video_id.
+    """
+    results: dict[str, Optional[dict[str, Any]]] = {}
+    pending = []  # (video_id, video_url, comment_texts, comment count, batches) awaiting the job
+    
+    for video_id, video_url, comment_file in targets:
+        logger.info(f"\n--- Preparing Video: {video_id} ---")
+        results[video_id] = None
+        try:
+            cached_analysis = load_cached_analysis(video_id, config_dict)
+            if cached_analysis:
+                results[video_id] = cached_analysis
+                continue
+            
+            loaded = load_filtered_comments(video_id, comment_file, config_dict)
+            if loaded is None:
+                continue
+            comment_texts, texts_to_process, filtered_count = loaded
+            
+            analyzed_comments = load_superset_analysis(video_id, config_dict, filtered_count)
+            if analyzed_comments is not None:
+                results[video_id] = build_video_result(video_id, video_url, comment_texts, analyzed_comments, config_dict)
+                continue
+            
+            pending.append((video_id, video_url, comment_texts, len(texts_to_process),
+                            make_comment_batches(texts_to_process, config_dict)))
+        except Exception as e:
+            utils.print_error(f"Error processing video {video_id}: {e}")
+    
+    if not pending:
+        return results
+    
+    all_batches = [batch_comments for *_, batches in pending for _, batch_comments in batches]
+    utils.print_progress(f"Analyzing {len(pending)} videos in one Batch API job ({len(all_batches)} batches)...")
+    try:
+        batch_results = iter(analyze_comments_batchapi(all_batches, config_dict['analysis_model'],
+                                                       config_dict.get('min_length', 10),
+                                                       config_dict.get('enable_fallback', True)))
+    except Exception as e:
+        utils.print_error(f"Error analyzing comments: {e}")
+        return results
+    
+    for video_id, video_url, comment_texts, comment_count, batches in pending:
+        all_results: list[Optional[dict[str, Any]]] = [None] * comment_count
+        for (batch_start, _), batch_result in zip(batches, islice(batch_results, len(batches))):
+            all_results[batch_start:batch_start + len(batch_result)] = batch_result
+        analyzed_comments = _drop_failed_results(all_results)
+        utils.print_success(f"Analyzed {len(analyzed_comments)} comments for video {video_id}")
+        try:
+            results[video_id] = build_video_result(video_id, video_url, comment_texts, analyzed_comments, config_dict)
+        except Exception as e:
+            utils.print_error(f"Error processing video {video_id}: {e}")
+    return results
+
+
+def analyze_videos(targets: list[tuple[str, str, str]], config_dict: dict[str, Any],
+                   max_workers: Optional[int] = None) -> dict[str, Optional[dict[str, Any]]]:
+    """Analyze several videos in parallel, each in its own worker process.
+
+    targets holds (video_id, video_url, comment_file) tuples; results are keyed by video_id.
+    Each video still runs its LLM batches concurrently inside its worker. With use_batch_api
+    all videos share one Batch API job instead (see analyze_videos_batchapi).
+    """
+    if not targets:
+        return {}
+    if config_dict.get('use_batch_api', False):
+        return analyze_videos_batchapi(targets, config_dict)
+    if max_workers is None:
+        max_workers = config_dict.get('max_video_workers', 4)
+    max_workers = max(1, min(max_workers, len(targets), os.cpu_count() or 1))
+    
+    results: dict[str, Optional[dict[str, Any]]] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        future_to_video = {
+            executor.submit(analyze_single_video, video_id, video_url, comment_file, config_dict): video_id
+            for video_id, video_url, comment_file in targets
+        }
+        for future in as_completed(future_to_video):
+            video_id = future_to_video[future]
+            try:
+                results[video_id] = future.result()
+            except Exception as e:
+                utils.print_error(f"Error processing video {video_id}: {e}")
+                results[video_id] = None
+    return results
+
+
 if __name__ == "__main__":
-    # Test single video analysis
+    # Analyze the given videos from their downloaded comment files
     import sys
     
     if len(sys.argv) > 1:
-        video_id = sys.argv[1]
-        config_manager = config.get_config()
-        
-        # Convert config to dict
-        config_dict = {
-            'analysis_model': config_manager.get_model(),
-            'filter_language': config_manager.get_filter_language(),
-            'min_length': config_manager.get_min_length(),
-            'batch_size': config_manager.get_batch_size(),
-            'max_comments': config_manager.get_max_comments(),
-            'enable_fallback': config_manager.get('enable_fallback'),
-            'max_batch_workers': config_manager.get('max_batch_workers'),
-            'use_cache': config_manager.should_use_cache(),
-            'cache_version': config_manager.get_cache_version(),
-            'analyze_audience': config_manager.should_analyze_audience(),
-            'language_analysis': config_manager.get('language_analysis')
-        }
+        video_ids = sys.argv[1:]
+        targets = [
+            (video_id, f"https://www.youtube.com/watch?v={video_id}", str(config.get_comment_file_path(video_id)))
+            for video_id in video_ids
+        ]
+        results = analyze_videos(targets, config.get_config())
         
-        # Find video info (this would need to be adapted to your video index)
-        # For now, use dummy data
-        result = analyze_single_video(video_id, f"test_url_{video_id}", f"data/comments/comments_{video_id}.json", config_dict)
-        
-        if result:
-            print(f"✓ Analysis completed for video {video_id}")
-        else:
-            print(f"✗ Analysis failed for video {video_id}")
+        for video_id in video_ids:
+            if results.get(video_id):
+                logger.info(f"✓ Analysis completed for video {video_id}")
+            else:
+                logger.error(f"✗ Analysis failed for video {video_id}")
     else:
-        print("Usage: python analyze_video.py <video_id>")
+        logger.info("Usage: python -m src.analyze_video <video_id> [<video_id> ...]")
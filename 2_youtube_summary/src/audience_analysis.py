@@ -3,18 +3,43 @@ Audience analysis module for YouTube comments.
 Analyzes language distribution, sentiment patterns, and audience demographics.
 """
 
-import json
-from typing import Any
+import os
+import re
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
 from collections import Counter, defaultdict
-import pandas as pd
-from langdetect import detect, DetectorFactory
+from datetime import datetime, timezone
+from pathlib import Path
+from langdetect import DetectorFactory
+from langdetect.detector_factory import PROFILES_DIRECTORY
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+import config
+from src import prompts, utils
+from src.logger import logger
+
 # Set seed for consistent language detection
 DetectorFactory.seed = 0
 
+# ASCII-only comments with at least two distinct English function words are labelled 'en'
+# without running the detector. ASCII alone is not enough: Czech and Slovak are often
+# typed without diacritics ("to je super video diky").
+_ASCII_RE = re.compile(r'[\x00-\x7F]+')
+_ENGLISH_WORD_RE = re.compile(
+    r"\b(?:the|and|you|your|this|that|is|are|was|were|have|has|for|with|what|it's|i'm|don't|thanks|thank)\b",
+    re.IGNORECASE,
+)
+MIN_SHORTCUT_LENGTH = 10
+
+# langdetect fallback: texts per worker task, and the fewest texts worth starting a process pool for
+DETECT_CHUNK_SIZE = 500
+PARALLEL_DETECT_MIN_TEXTS = 2000
+
 # Language code to name mapping
 LANGUAGE_NAMES = {
     'cs': 'Czech', 'sk': 'Slovak', 'en': 'English', 'de': 'German', 
@@ -26,80 +51,119 @@ LANGUAGE_NAMES = {
 }
 
 
+# langdetect profiles to load: only the languages the reports know by name
+# (Chinese ships as two profiles)
+LANGDETECT_PROFILES = tuple(sorted(LANGUAGE_NAMES.keys() - {'unknown', 'zh'})) + ('zh-cn', 'zh-tw')
+
+
+@functools.lru_cache(maxsize=1)
+def _get_langdetect_factory() -> DetectorFactory:
+    """Build a langdetect factory holding only LANGDETECT_PROFILES, once per process.
+
+    langdetect's global factory loads all 55 profiles; audience analysis only reports the
+    languages in LANGUAGE_NAMES, so it uses this smaller one. utils.detect_language_safe
+    keeps the full set because filter_language may name any language.
+    """
+    factory = DetectorFactory()
+    profiles_dir = Path(PROFILES_DIRECTORY)
+    factory.load_json_profile([(profiles_dir / name).read_text(encoding='utf-8') for name in LANGDETECT_PROFILES])
+    return factory
+
+
+@functools.lru_cache(maxsize=200_000)
 def detect_language_safe(text: str) -> str:
-    """Safely detect language of text, return 'unknown' if detection fails."""
+    """Safely detect language of text, return 'unknown' if detection fails.
+
+    Results are cached per text: short comments ("nice video", "first") repeat a lot,
+    and detection is deterministic with the fixed seed.
+    """
+    if (len(text) >= MIN_SHORTCUT_LENGTH and _ASCII_RE.fullmatch(text)
+            and len({word.lower() for word in _ENGLISH_WORD_RE.findall(text)}) >= 2):
+        return 'en'
     try:
-        return detect(text)
+        detector = _get_langdetect_factory().create()
+        detector.append(text)
+        return detector.detect()
     except:
         return 'unknown'
 
 
-def analyze_language_distribution(comments: list[dict[str, Any]]) -> dict[str, Any]:
-    """
-    Analyze the language distribution of comments.
+def _detect_batch(texts: list[str]) -> list[str]:
+    """Detect languages of a chunk of texts with langdetect (also the process pool task)."""
+    return [detect_language_safe(text) for text in texts]
+
+
+def _detect_languages_parallel(texts: list[str]) -> list[str]:
+    """Spread langdetect over a process pool for large inputs, keeping input order.
+
+    Runs in-process for small inputs, on single-core machines and inside video-level workers
+    (worker processes, or threads other than the main thread), which already run in parallel;
+    that also keeps a thread pool run from starting a process pool per video thread.
     """
-    if not comments:
-        return {"languages": {}, "total_comments": 0, "detected_languages": 0}
-    
-    # Extract text and detect languages
-    comment_texts = [comment.get('text', '') for comment in comments if comment.get('text')]
-    
-    # Detect languages
-    languages = []
-    for text in comment_texts:
-        if len(text.strip()) >= 10:  # Only detect for longer texts
-            lang = detect_language_safe(text)
-            languages.append(lang)
-    
+    cpu_count = os.cpu_count() or 1
+    if (len(texts) < PARALLEL_DETECT_MIN_TEXTS or cpu_count < 2
+            or multiprocessing.parent_process() is not None
+            or threading.current_thread() is not threading.main_thread()):
+        return _detect_batch(texts)
+    
+    chunks = [texts[i:i + DETECT_CHUNK_SIZE] for i in range(0, len(texts), DETECT_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=min(cpu_count, len(chunks))) as executor:
+        return [lang for chunk_languages in executor.map(_detect_batch, chunks) for lang in chunk_languages]
+
+
+def detect_languages(texts: list[str]) -> list[str]:
+    """Detect the language of each text, in one fastText batch call when the model is available."""
+    if not texts:
+        return []
+    # Copy-pasted and emoji-only comments repeat a lot; detect each distinct text once
+    unique_texts = list(dict.fromkeys(texts))
+    if len(unique_texts) < len(texts):
+        language_of = dict(zip(unique_texts, detect_languages(unique_texts)))
+        return [language_of[text] for text in texts]
+    
+    model = utils.get_language_model()
+    if model is None:
+        return _detect_languages_parallel([text.strip() for text in texts])
+    
+    # fastText predicts one line per text
+    labels, _ = model.predict([text.strip().replace("\n", " ") for text in texts])
+    return [text_labels[0].removeprefix(utils.FASTTEXT_LABEL_PREFIX) if text_labels else 'unknown'
+            for text_labels in labels]
+
+
+def _summarize_languages(languages: list[str], total_comments: int) -> dict[str, Any]:
+    """Build the language distribution stats from the detected languages."""
     # Count languages
     language_counts = Counter(languages)
     total_detected = len(languages)
     
     # Calculate percentages and create detailed stats
     language_stats = {}
+    percent_per_comment = 100 / total_detected if total_detected > 0 else 0
     for lang_code, count in language_counts.most_common():
         lang_name = LANGUAGE_NAMES.get(lang_code, lang_code.upper())
-        percentage = (count / total_detected * 100) if total_detected > 0 else 0
         
         language_stats[lang_code] = {
             'name': lang_name,
             'count': count,
-            'percentage': round(percentage, 2)
+            'percentage': round(count * percent_per_comment, 2)
         }
     
     return {
         'languages': language_stats,
-        'total_comments': len(comment_texts),
+        'total_comments': total_comments,
         'detected_languages': total_detected,
         'primary_language': language_counts.most_common(1)[0] if language_counts else ('unknown', 0)
     }
 
 
-def analyze_sentiment_by_language(analyzed_comments: list[dict[str, Any]], comments_raw: list[dict[str, Any]]) -> dict[str, Any]:
-    """
-    Analyze sentiment patterns by language.
-    """
-    if not analyzed_comments or not comments_raw:
-        return {}
-    
-    # Map analyzed comments back to original texts for language detection
+def _summarize_sentiment_by_language(language_sentiments) -> dict[str, Any]:
+    """Build the sentiment-by-language stats from (language, sentiment) pairs."""
+    # Tally the pairs in C, then fold the few distinct ones into per-language counts
     sentiment_by_language = defaultdict(lambda: {'positive': 0, 'negative': 0, 'neutral': 0, 'total': 0})
-    
-    # Process comments that have both raw text and analysis
-    min_length = min(len(analyzed_comments), len(comments_raw))
-    
-    for i in range(min_length):
-        analysis = analyzed_comments[i]
-        raw_comment = comments_raw[i]
-        
-        if analysis and not analysis.get('error') and raw_comment.get('text'):
-            # Detect language
-            lang = detect_language_safe(raw_comment['text'])
-            sentiment = analysis.get('sentiment', 'neutral')
-            
-            # Count sentiment by language
-            sentiment_by_language[lang][sentiment] += 1
-            sentiment_by_language[lang]['total'] += 1
+    for (lang, sentiment), count in Counter(language_sentiments).items():
+        sentiment_by_language[lang][sentiment] += count
+        sentiment_by_language[lang]['total'] += count
     
     # Calculate percentages
     result = {}
@@ -107,20 +171,87 @@ def analyze_sentiment_by_language(analyzed_comments: list[dict[str, Any]], comme
         total = sentiments['total']
         if total > 0:
             lang_name = LANGUAGE_NAMES.get(lang, lang.upper())
+            percent_per_comment = 100 / total
             result[lang] = {
                 'name': lang_name,
                 'total_comments': total,
                 'positive': sentiments['positive'],
                 'negative': sentiments['negative'],
                 'neutral': sentiments['neutral'],
-                'positive_percentage': round((sentiments['positive'] / total) * 100, 2),
-                'negative_percentage': round((sentiments['negative'] / total) * 100, 2),
-                'neutral_percentage': round((sentiments['neutral'] / total) * 100, 2)
+                'positive_percentage': round(sentiments['positive'] * percent_per_comment, 2),
+                'negative_percentage': round(sentiments['negative'] * percent_per_comment, 2),
+                'neutral_percentage': round(sentiments['neutral'] * percent_per_comment, 2)
             }
     
     return result
 
 
+def _distribution_indices(comments: list[Optional[str]]) -> list[int]:
+    """Positions of the comments long enough to count in the language distribution."""
+    return [i for i, text in enumerate(comments) if text and len(text.strip()) >= 10]
+
+
+def _sentiment_indices(analyzed_comments: list[dict[str, Any]], comments_raw: list[Optional[str]]) -> list[int]:
+    """Positions that have both raw text and a successful analysis."""
+    # zip stops at the shorter list, so positions past either end are never considered
+    return [i for i, (analysis, text) in enumerate(zip(analyzed_comments, comments_raw))
+            if analysis and text and not analysis.get('error')]
+
+
+def analyze_language_distribution(comments: list[Optional[str]]) -> dict[str, Any]:
+    """
+    Analyze the language distribution of comments (given as their texts).
+    """
+    if not comments:
+        return {"languages": {}, "total_comments": 0, "detected_languages": 0}
+    
+    # Detect languages (only for longer texts)
+    languages = detect_languages([comments[i] for i in _distribution_indices(comments)])
+    return _summarize_languages(languages, sum(1 for text in comments if text))
+
+
+def analyze_sentiment_by_language(analyzed_comments: list[dict[str, Any]], comments_raw: list[Optional[str]]) -> dict[str, Any]:
+    """
+    Analyze sentiment patterns by language.
+    """
+    if not analyzed_comments or not comments_raw:
+        return {}
+    
+    # Process comments that have both raw text and analysis, detecting languages in one batch
+    valid = [(text, analysis.get('sentiment', 'neutral'))
+             for analysis, text in zip(analyzed_comments, comments_raw)
+             if analysis and text and not analysis.get('error')]
+    languages = detect_languages([text for text, _ in valid])
+    return _summarize_sentiment_by_language(
+        (lang, sentiment) for lang, (_, sentiment) in zip(languages, valid)
+    )
+
+
+def analyze_language_and_sentiment(comments_raw: list[Optional[str]],
+                                   analyzed_comments: list[dict[str, Any]]) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Language distribution and sentiment by language, detecting each comment's language once.
+
+    Returns the same pair of results as analyze_language_distribution and
+    analyze_sentiment_by_language, which would otherwise both detect the same texts.
+    """
+    if not comments_raw:
+        return analyze_language_distribution(comments_raw), {}
+    
+    distribution_indices = _distribution_indices(comments_raw)
+    sentiment_indices = _sentiment_indices(analyzed_comments, comments_raw) if analyzed_comments else []
+    
+    # One detection pass over every position either analysis needs
+    needed = sorted(set(distribution_indices).union(sentiment_indices))
+    language_at = dict(zip(needed, detect_languages([comments_raw[i] for i in needed])))
+    
+    language_analysis = _summarize_languages([language_at[i] for i in distribution_indices],
+                                             sum(1 for text in comments_raw if text))
+    sentiment_by_language = _summarize_sentiment_by_language(
+        (language_at[i], analyzed_comments[i].get('sentiment', 'neutral')) for i in sentiment_indices
+    )
+    return language_analysis, sentiment_by_language
+
+
 def analyze_engagement_patterns(analyzed_comments: list[dict[str, Any]]) -> dict[str, Any]:
     """
     Analyze engagement patterns from comments.
@@ -137,19 +268,17 @@ def analyze_engagement_patterns(analyzed_comments: list[dict[str, Any]]) -> dict
     relevant_count = sum(1 for c in valid_comments if c.get('is_relevant_feedback', False))
     total_count = len(valid_comments)
     
-    # Analyze topics distribution
-    all_topics = []
-    for comment in valid_comments:
-        topics = comment.get('topics', [])
-        if topics:
-            all_topics.extend([topic.lower().strip() for topic in topics if isinstance(topic, str)])
-    
-    topic_counts = Counter(all_topics)
+    # Analyze topics distribution: tally raw tags first, then normalize each distinct spelling once
+    raw_topic_counts = Counter(topic for c in valid_comments for topic in c.get('topics') or ()
+                               if isinstance(topic, str))
+    topic_counts = Counter()
+    for topic, count in raw_topic_counts.items():
+        topic_counts[topic.lower().strip()] += count
     
-    # Analyze feedback types
-    has_pain_points = sum(1 for c in valid_comments if c.get('pain_points') and len(c['pain_points']) > 0)
-    has_advantages = sum(1 for c in valid_comments if c.get('advantages') and len(c['advantages']) > 0)
-    has_recommendations = sum(1 for c in valid_comments if c.get('recommendations_for_creator') and len(c['recommendations_for_creator']) > 0)
+    # Analyze feedback types (an empty list is falsy, no separate length check needed)
+    has_pain_points = sum(1 for c in valid_comments if c.get('pain_points'))
+    has_advantages = sum(1 for c in valid_comments if c.get('advantages'))
+    has_recommendations = sum(1 for c in valid_comments if c.get('recommendations_for_creator'))
     
     return {
         'total_analyzed': total_count,
@@ -167,6 +296,19 @@ def analyze_engagement_patterns(analyzed_comments: list[dict[str, Any]]) -> dict
     }
 
 
+_AUDIENCE_PROFILE_PROMPT = ChatPromptTemplate.from_template(prompts.AUDIENCE_PROFILE_PROMPT)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_audience_profile_chain(model_name: str):
+    """Audience profile chain for a model, built once per process and reused across videos."""
+    llm = ChatOpenAI(
+        model=model_name,
+        temperature=0
+    )
+    return _AUDIENCE_PROFILE_PROMPT | llm | StrOutputParser()
+
+
 def generate_audience_profile(language_analysis: dict[str, Any], sentiment_by_language: dict[str, Any], 
                             engagement_patterns: dict[str, Any], model_name: str) -> str:
     """
@@ -179,60 +321,24 @@ def generate_audience_profile(language_analysis: dict[str, Any], sentiment_by_la
         'engagement_patterns': engagement_patterns
     }
     
-    # Initialize LLM
-    llm = ChatOpenAI(
-        model=model_name,
-        temperature=0
-    )
-    
-    # Create prompt
-    prompt_template = """
-    You are an expert audience analyst for YouTube channels. Based on the following comment analysis data, 
-    provide insights about the channel's audience demographics, behavior patterns, and engagement characteristics.
-
-    Analysis Data:
-    {analysis_data}
-
-    Please provide a comprehensive audience profile that includes:
-
-    1. **Geographic/Cultural Audience**: Based on language distribution, what can we infer about the audience's geographic spread and cultural background?
-
-    2. **Engagement Quality**: How engaged and constructive is this audience? What does their feedback behavior tell us?
-
-    3. **Audience Characteristics**: What personality traits, interests, or demographics can we infer from comment patterns?
-
-    4. **Content Preferences**: What topics or content types seem to resonate most with this audience?
-
-    5. **Community Health**: How healthy and constructive is the comment community?
-
-    6. **Growth Opportunities**: What insights for channel growth can be derived from this audience analysis?
-
-    Provide specific, actionable insights based on the data. Be concrete rather than generic.
-    Respond in English with clear headings and bullet points.
-    """
-    
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | llm | StrOutputParser()
+    chain = _get_audience_profile_chain(model_name)
     
     try:
-        profile = chain.invoke({"analysis_data": json.dumps(analysis_data, indent=2, ensure_ascii=False)})
+        profile = chain.invoke({"analysis_data": config.dumps(analysis_data).decode('utf-8')})
         return profile
     except Exception as e:
         return f"Error generating audience profile: {e}"
 
 
-def analyze_video_audience(video_id: str, comments_raw: list[dict[str, Any]], 
+def analyze_video_audience(video_id: str, comments_raw: list[Optional[str]], 
                           analyzed_comments: list[dict[str, Any]], config: dict[str, Any]) -> dict[str, Any]:
     """
     Complete audience analysis for a single video.
     """
-    print(f"  📊 Analyzing audience for video {video_id}...")
-    
-    # Language distribution analysis
-    language_analysis = analyze_language_distribution(comments_raw)
+    logger.info(f"  📊 Analyzing audience for video {video_id}...")
     
-    # Sentiment by language analysis
-    sentiment_by_language = analyze_sentiment_by_language(analyzed_comments, comments_raw)
+    # Language distribution and sentiment by language (one detection pass)
+    language_analysis, sentiment_by_language = analyze_language_and_sentiment(comments_raw, analyzed_comments)
     
     # Engagement patterns analysis
     engagement_patterns = analyze_engagement_patterns(analyzed_comments)
@@ -240,7 +346,7 @@ def analyze_video_audience(video_id: str, comments_raw: list[dict[str, Any]],
     # Generate AI audience profile if enabled
     audience_profile = ""
     if config.get('analyze_audience', False):
-        print(f"  🤖 Generating AI audience profile...")
+        logger.info(f"  🤖 Generating AI audience profile...")
         audience_profile = generate_audience_profile(
             language_analysis, sentiment_by_language, engagement_patterns, config['analysis_model']
         )
@@ -251,7 +357,7 @@ def analyze_video_audience(video_id: str, comments_raw: list[dict[str, Any]],
         'sentiment_by_language': sentiment_by_language,
         'engagement_patterns': engagement_patterns,
         'audience_profile': audience_profile,
-        'analysis_timestamp': pd.Timestamp.now().isoformat()
+        'analysis_timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')
     }
 
 
@@ -263,24 +369,25 @@ def aggregate_audience_analysis(video_analyses: list[dict[str, Any]]) -> dict[st
         return {}
     
     # Aggregate language distribution
-    total_languages = defaultdict(lambda: {'count': 0, 'percentage': 0})
+    language_counts = Counter()
     total_comments = 0
     
     for analysis in video_analyses:
         lang_analysis = analysis.get('language_analysis', {})
-        languages = lang_analysis.get('languages', {})
-        video_total = lang_analysis.get('total_comments', 0)
-        
-        total_comments += video_total
-        
-        for lang_code, lang_data in languages.items():
-            total_languages[lang_code]['count'] += lang_data['count']
-            total_languages[lang_code]['name'] = lang_data.get('name', lang_code.upper())
-    
-    # Recalculate percentages
-    for lang_code, lang_data in total_languages.items():
-        if total_comments > 0:
-            lang_data['percentage'] = round((lang_data['count'] / total_comments) * 100, 2)
+        total_comments += lang_analysis.get('total_comments', 0)
+        language_counts.update({lang_code: lang_data['count']
+                                for lang_code, lang_data in lang_analysis.get('languages', {}).items()})
+    
+    # Resolve names and percentages once per language
+    percent_per_comment = 100 / total_comments if total_comments > 0 else 0
+    total_languages = {
+        lang_code: {
+            'count': count,
+            'percentage': round(count * percent_per_comment, 2),
+            'name': LANGUAGE_NAMES.get(lang_code, lang_code.upper())
+        }
+        for lang_code, count in language_counts.items()
+    }
     
     # Aggregate engagement patterns
     total_engagement = {
@@ -295,9 +402,9 @@ def aggregate_audience_analysis(video_analyses: list[dict[str, Any]]) -> dict[st
         )
     
     return {
-        'channel_language_distribution': dict(total_languages),
+        'channel_language_distribution': total_languages,
         'channel_engagement_summary': total_engagement,
         'total_comments_analyzed': total_comments,
         'videos_analyzed': len(video_analyses),
-        'analysis_timestamp': pd.Timestamp.now().isoformat()
+        'analysis_timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds')
     }
@@ -1,22 +1,41 @@
-import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from typing import Iterable, Iterator, Optional
 from youtube_comment_downloader import YoutubeCommentDownloader
 import os
 
 import config
 from src import utils
+from src.logger import start_listener
+
+MAX_DOWNLOAD_WORKERS = 8
+WRITE_BUFFER_SIZE = 1 << 20  # bytes
+WRITE_CHUNK_SIZE = 1000  # comments serialized per write
 
 def _atomic_write_json(path, data):
     """Atomically write JSON: dump → flush+fsync → rename."""
     tmp = path.with_suffix(path.suffix + ".tmp")
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with open(tmp, "wb") as f:
+        f.write(config.dumps(data))
         f.flush()
         os.fsync(f.fileno())
     os.replace(tmp, path)
 
-def download_comments(video_url: str, force_download: bool = False) -> list:
-    """Download comments from a YouTube video."""
+def _iter_comments(video_url: str) -> Iterator[dict]:
+    """Yield comments as the downloader fetches them; a failed download ends the stream early."""
+    ycd = YoutubeCommentDownloader()
+    try:
+        utils.print_progress(f"Downloading comments from: {video_url}")
+        yield from ycd.get_comments_from_url(video_url)
+    except Exception as e:
+        utils.print_error(f"Error downloading comments: {e}")
+
+def download_comments(video_url: str, force_download: bool = False) -> int:
+    """Download comments from a YouTube video straight into its comment file.
+
+    Returns the number of comments saved (0 if the file already exists or nothing was downloaded).
+    """
     video_id = config.get_video_id_from_url(video_url)
     filepath = config.get_comment_file_path(video_id)
     
@@ -24,34 +43,41 @@ def download_comments(video_url: str, force_download: bool = False) -> list:
     if os.path.exists(filepath) and not force_download:
         utils.print_info(f"Comments file already exists for video {video_id}: {filepath}")
         utils.print_info("Use force_download=True to re-download")
-        return []
-    
-    ycd = YoutubeCommentDownloader()
-    comments = []
+        return 0
     
-    try:
-        utils.print_progress(f"Downloading comments from: {video_url}")
-        for comment in ycd.get_comments_from_url(video_url):
-            comments.append(comment)
-        utils.print_success(f"Downloaded {len(comments)} comments")
-    except Exception as e:
-        utils.print_error(f"Error downloading comments: {e}")
+    count = save_comments_to_file(_iter_comments(video_url), video_url)
+    utils.print_success(f"Downloaded {count} comments")
+    return count
 
-    return comments
+def save_comments_to_file(comments: Iterable[dict], video_url: str) -> int:
+    """Stream comments to the video's JSONL file as they arrive and return how many were saved.
 
-def save_comments_to_file(comments: list, video_url: str) -> str:
-    """Save comments to a JSON file."""
+    Lines are written in chunks to a temporary file that is fsynced and replaces the
+    comment file only if at least one comment was written, so a failed download never
+    clobbers an existing file.
+    """
     video_id = config.get_video_id_from_url(video_url)
     filepath = config.get_comment_file_path(video_id)  # Remove timestamp parameter
+    tmp = filepath.with_suffix(filepath.suffix + ".tmp")
+    count = 0
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            for comment in comments:
-                f.write(json.dumps(comment, ensure_ascii=False) + '\n')
-
-        utils.print_success(f"Saved {len(comments)} comments to: {filepath}")
-        return str(filepath)
+        comments = iter(comments)
+        with open(tmp, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            while chunk := list(islice(comments, WRITE_CHUNK_SIZE)):
+                f.write(b'\n'.join(map(config.dumps_line, chunk)) + b'\n')
+                count += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        if count:
+            os.replace(tmp, filepath)
+            utils.print_success(f"Saved {count} comments to: {filepath}")
+        else:
+            tmp.unlink()
+        return count
     except Exception as e:
         utils.print_error(f"Error saving comments to file: {e}")
+        tmp.unlink(missing_ok=True)
         raise
 
 def create_video_index(video_urls: list, comment_files: list) -> str:
@@ -73,8 +99,21 @@ def create_video_index(video_urls: list, comment_files: list) -> str:
     utils.print_success(f"Created index file: {index_filepath}")
     return str(index_filepath)
 
+def _download_video(video_url: str, force_download: bool) -> Optional[str]:
+    """Download one video's comments and return its comment file, or None if there is none."""
+    comment_file = config.get_comment_file_path(config.get_video_id_from_url(video_url))
+    if download_comments(video_url, force_download):
+        return str(comment_file)
+    
+    # Check if file already exists (skipped download)
+    if os.path.exists(comment_file):
+        utils.print_success(f"Using existing comments file: {comment_file}")
+        return str(comment_file)
+    return None
+
 def main():
     """Main function to download comments from all configured videos."""
+    start_listener()
     utils.print_section("YouTube Comments Downloader")
 
     try:
@@ -87,43 +126,41 @@ def main():
         utils.print_progress(f"Videos to process: {len(cfg['video_urls'])}")
         utils.print_progress(f"Analysis model: {cfg.get('analysis_model', 'not specified')}")
 
-        video_urls = cfg['video_urls']
+        # URLs naming the same video (repeats, youtu.be vs watch?v=) share one download, since
+        # concurrent downloads of one video would write the same temporary file
+        urls_by_video_id = {}
+        for video_url in cfg['video_urls']:
+            urls_by_video_id.setdefault(config.get_video_id_from_url(video_url), video_url)
+        video_urls = list(urls_by_video_id.values())
+        if len(video_urls) < len(cfg['video_urls']):
+            utils.print_warning(f"Skipping {len(cfg['video_urls']) - len(video_urls)} duplicate video URLs")
         force_download = cfg.get('force_download', False)  # Add force download option
         
     except Exception as e:
         utils.print_error(f"Setup failed: {e}")
         return
     
-    # Download comments for all videos
+    # Download comments for all videos; each download is I/O-bound, so threads overlap them
     utils.print_step(2, 3, "Download Comments")
-    comment_files = []
-    successful_downloads = 0
+    comment_files = [None] * len(video_urls)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_DOWNLOAD_WORKERS, len(video_urls)))) as executor:
+        futures = {
+            executor.submit(_download_video, video_url, force_download): video_index
+            for video_index, video_url in enumerate(video_urls)
+        }
+        for future in as_completed(futures):
+            video_index = futures[future]
+            utils.print_info(f"\n--- Finished Video {video_index + 1}/{len(video_urls)} ---")
+            try:
+                comment_files[video_index] = future.result()
+            except Exception as e:
+                utils.print_error(f"Error processing video {video_index + 1}: {e}")
+                continue
+            if comment_files[video_index] is None:
+                utils.print_error(f"No comments downloaded for video {video_index + 1}")
     
-    for video_index, video_url in enumerate(video_urls):
-        utils.print_info(f"\n--- Processing Video {video_index + 1}/{len(video_urls)} ---")
-
-        try:
-            comments = download_comments(video_url, force_download)
-            
-            if comments:
-                comment_file = save_comments_to_file(comments, video_url)
-                comment_files.append(comment_file)
-                successful_downloads += 1
-            else:
-                # Check if file already exists (skipped download)
-                video_id = config.get_video_id_from_url(video_url)
-                existing_file = config.get_comment_file_path(video_id)
-                if os.path.exists(existing_file):
-                    comment_files.append(existing_file)
-                    successful_downloads += 1
-                    utils.print_success(f"Using existing comments file: {existing_file}")
-                else:
-                    utils.print_error(f"No comments downloaded for video {video_index + 1}")
-                    comment_files.append(None)
-                
-        except Exception as e:
-            utils.print_error(f"Error processing video {video_index + 1}: {e}")
-            comment_files.append(None)
+    successful_downloads = sum(file is not None for file in comment_files)
     
     # Create index file
     utils.print_step(3, 3, "Create Index")
@@ -0,0 +1,85 @@
+"""
+Console logger for YouTube Comments Analysis Pipeline.
+Messages go straight to stdout until an entry point calls start_listener(); from then on
+worker threads only enqueue log records and a single listener thread writes them to stdout,
+flushing once per burst of queued messages rather than once per line.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+logger = logging.getLogger("youtube_pipeline")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_listener = None
+
+
+class _DeferredFlushHandler(logging.StreamHandler):
+    """Console handler that leaves flushing to the listener (see _BatchingQueueListener)."""
+
+    def flush(self):
+        pass
+
+    def flush_now(self):
+        super().flush()
+
+
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes the console once the queue has been drained."""
+
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            self.flush()
+
+    def flush(self):
+        for handler in self.handlers:
+            handler.flush_now()
+
+
+def _console_handler(handler_class=logging.StreamHandler) -> logging.Handler:
+    """Create the handler that actually writes messages to the console."""
+    handler = handler_class(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+
+def start_listener():
+    """Route the logger through a queue drained by a background thread.
+
+    Only called by entry points that log from many threads and never fork worker
+    processes, so no process is forked while the listener thread is running.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    _listener = _BatchingQueueListener(log_queue, _console_handler(_DeferredFlushHandler))
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    _listener.start()
+
+
+def _use_direct_output():
+    """Write directly to the console (the default, and in forked workers, where the listener thread does not exist)."""
+    global _listener
+    _listener = None
+    logger.handlers[:] = [_console_handler()]
+
+
+def stop():
+    """Drain queued messages, stop the listener thread and fall back to direct output."""
+    if _listener is not None:
+        _listener.stop()
+        _listener.flush()
+    _use_direct_output()
+
+
+_use_direct_output()
+atexit.register(stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_use_direct_output)
@@ -58,17 +58,15 @@ Provide specific, actionable insights based on the data. Be concrete rather than
 Respond in English with clear headings and bullet points.
 """
 
+# Report prompts are split into static instructions (sent as the system message) and the
+# per-run data (the user message), so the identical instruction prefix can be served from
+# the provider's prompt cache.
+
 # Audience insights report prompt
-AUDIENCE_INSIGHTS_REPORT_PROMPT = """
+AUDIENCE_INSIGHTS_REPORT_INSTRUCTIONS = """
 You are an expert audience analyst for YouTube channels. Based on the aggregated audience analysis data 
 from multiple videos, provide comprehensive insights about the channel's overall audience.
 
-Aggregated Audience Data:
-{audience_data}
-
-Individual Video Audience Analyses:
-{video_analyses}
-
 Please provide a detailed audience insights report that includes:
 
 1. **Channel Audience Overview**: Overall demographic and behavioral characteristics
@@ -80,17 +78,24 @@ Please provide a detailed audience insights report that includes:
 7. **Cultural and Regional Insights**: What the language distribution tells us about audience culture
 
 Focus on actionable insights that can help with content strategy, community building, and channel growth.
-Respond in {output_language} with clear headings and specific data-driven insights.
+Use clear headings and specific data-driven insights.
+"""
+
+AUDIENCE_INSIGHTS_REPORT_PROMPT = """
+Aggregated Audience Data:
+{audience_data}
+
+Individual Video Audience Analyses:
+{video_analyses}
+
+Respond in {output_language}.
 """
 
 # Key insights report prompt (focused and concise)
-KEY_INSIGHTS_REPORT_PROMPT = """
+KEY_INSIGHTS_REPORT_INSTRUCTIONS = """
 Based on the video comment analyses provided, generate a concise strategic report focused on key insights and actionable recommendations only.
 
-VIDEO ANALYSES:
-{video_summaries}
-
-Please create a report in {output_language} with the following structure:
+Please create a report with the following structure:
 1. EXECUTIVE SUMMARY (3-5 key findings)
 2. TOP 3 STRATEGIC RECOMMENDATIONS
 3. CONTENT PERFORMANCE HIGHLIGHTS (most successful content types)
@@ -99,27 +104,18 @@ Please create a report in {output_language} with the following structure:
 Keep the report concise and focused on actionable insights. Maximum 1500 words.
 """
 
+KEY_INSIGHTS_REPORT_PROMPT = """
+VIDEO ANALYSES:
+{video_summaries}
+
+Write the report in {output_language}.
+"""
+
 # Comprehensive report generation prompt
-COMPREHENSIVE_REPORT_PROMPT = """
+COMPREHENSIVE_REPORT_INSTRUCTIONS = """
 You are an experienced YouTube channel analyst preparing a comprehensive strategic report for a content creator.
 You have access to detailed comment analysis data from multiple videos and audience insights.
 
-VIDEO ANALYSIS DATA:
-```json
-{video_summaries_json}
-```
-
-AUDIENCE INSIGHTS:
-```
-{audience_insights}
-```
-
-ANALYSIS CONFIGURATION:
-- Analysis Model: {analysis_model}
-- Videos Analyzed: {videos_analyzed}
-- Language Filter: {language_filter}
-- Minimum Comment Length: {min_length} characters
-
 Your task is to create a comprehensive strategic report that combines both content analysis and audience insights.
 Structure your report as follows:
 
@@ -168,5 +164,78 @@ Structure your report as follows:
 - Long-term strategic goals (6+ months)
 
 Make the report actionable, specific, and data-driven. Include relevant statistics and examples.
+"""
+
+COMPREHENSIVE_REPORT_PROMPT = """
+ANALYSIS CONFIGURATION:
+- Analysis Model: {analysis_model}
+- Videos Analyzed: {videos_analyzed}
+- Language Filter: {language_filter}
+- Minimum Comment Length: {min_length} characters
+
+VIDEO ANALYSIS DATA:
+```json
+{video_summaries_json}
+```
+
+AUDIENCE INSIGHTS:
+```
+{audience_insights}
+```
+
 Respond in {output_language}.
 """
+
+# All reports in one call (batch_reports: true). The shared data is sent once and the
+# sections mirror the audience insights, key insights and comprehensive reports above.
+BATCHED_REPORTS_INSTRUCTIONS = """
+You are an experienced YouTube channel analyst preparing two reports for a content creator from the same data.
+
+### SECTION: key_insights
+A concise strategic report focused on key insights and actionable recommendations only, with this structure:
+1. EXECUTIVE SUMMARY (3-5 key findings)
+2. TOP 3 STRATEGIC RECOMMENDATIONS
+3. CONTENT PERFORMANCE HIGHLIGHTS (most successful content types)
+4. CRITICAL AREAS FOR IMPROVEMENT (top 3 issues to address)
+Maximum 1500 words.
+
+### SECTION: comprehensive
+A comprehensive strategic report that combines content analysis and audience insights, structured as:
+## EXECUTIVE SUMMARY (key findings, primary strengths and areas for improvement, top 3 strategic recommendations)
+## CONTENT ANALYSIS (overall performance across videos, content strengths, areas for content improvement)
+## AUDIENCE ANALYSIS (audience overview, language and geographic distribution, engagement patterns by language group,
+feedback quality and community health, cultural and regional insights; if audience analysis was not enabled, say so)
+## STRATEGIC RECOMMENDATIONS (content strategy, audience development, production and quality)
+## ACTION PLAN (next 30 days, 3-6 months, 6+ months)
+Make it actionable, specific and data-driven, with relevant statistics and examples.
+
+Write both reports as Markdown.
+Respond with only a JSON object of this form, each value being the full Markdown report:
+{{
+    "key_insights": "...",
+    "comprehensive": "..."
+}}
+"""
+
+BATCHED_REPORTS_PROMPT = """
+ANALYSIS CONFIGURATION:
+- Analysis Model: {analysis_model}
+- Videos Analyzed: {videos_analyzed}
+- Language Filter: {language_filter}
+- Minimum Comment Length: {min_length} characters
+
+VIDEO ANALYSIS DATA:
+```json
+{video_summaries_json}
+```
+
+AGGREGATED AUDIENCE DATA:
+```
+{audience_data}
+```
+
+INDIVIDUAL VIDEO AUDIENCE ANALYSES:
+{video_analyses}
+
+Write both reports in {output_language}.
+"""
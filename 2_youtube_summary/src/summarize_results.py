@@ -3,34 +3,97 @@ Final summarization module.
 Generates comprehensive reports from aggregated analysis results.
 """
 
+import os
 import json
+import shutil
+import asyncio
+import hashlib
+import functools
 from typing import Any, Optional
 from pathlib import Path
 from datetime import datetime
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 
 import config
 from config import get_config
 from src import prompts
+from src.logger import logger, start_listener
 from src.audience_analysis import aggregate_audience_analysis
 
+# Keys of the JSON object returned by the batched report prompt
+REPORT_SECTIONS = ('key_insights', 'comprehensive')
+
+@functools.lru_cache(maxsize=8)
+def get_report_model(model_name: str) -> ChatOpenAI:
+    """Report LLM for a model, shared by every report chain so they reuse one HTTP client."""
+    return ChatOpenAI(
+        model=model_name,
+        temperature=0.1
+    )
+
+def report_prompt(instructions: str, data_template: str) -> ChatPromptTemplate:
+    """Static instructions as the system message, then the per-run data as the user message.
+
+    Keeping the unchanging text first lets OpenAI serve it from its automatic prompt cache.
+    """
+    return ChatPromptTemplate.from_messages([("system", instructions), ("human", data_template)])
+
+# Report templates, parsed once at import
+AUDIENCE_INSIGHTS_TEMPLATE = report_prompt(prompts.AUDIENCE_INSIGHTS_REPORT_INSTRUCTIONS, prompts.AUDIENCE_INSIGHTS_REPORT_PROMPT)
+KEY_INSIGHTS_TEMPLATE = report_prompt(prompts.KEY_INSIGHTS_REPORT_INSTRUCTIONS, prompts.KEY_INSIGHTS_REPORT_PROMPT)
+COMPREHENSIVE_TEMPLATE = report_prompt(prompts.COMPREHENSIVE_REPORT_INSTRUCTIONS, prompts.COMPREHENSIVE_REPORT_PROMPT)
+BATCHED_REPORTS_TEMPLATE = report_prompt(prompts.BATCHED_REPORTS_INSTRUCTIONS, prompts.BATCHED_REPORTS_PROMPT)
+
+async def invoke_cached(prompt: ChatPromptTemplate, model: ChatOpenAI, parser: Runnable, inputs: dict[str, Any]) -> Any:
+    """Run prompt | model | parser, reusing the stored response for an identical request.
+
+    The cache key covers the model and the fully rendered messages, so any change in the
+    data, settings or prompt text produces a new request. Only parsed responses are stored.
+    """
+    messages = prompt.format_messages(**inputs)
+    digest = hashlib.blake2b(model.model_name.encode('utf-8'), digest_size=16)
+    for message in messages:
+        digest.update(b'\x00' + message.type.encode('utf-8') + b'\x00' + message.text.encode('utf-8'))
+    cache_path = config.REPORT_CACHE_DIR / f"{digest.hexdigest()}.json"
+    
+    use_cache = get_config().get('use_cache', True)
+    if use_cache and cache_path.exists():
+        logger.info(f"Using cached report response: {cache_path.name}")
+        return config.loads(cache_path.read_bytes())
+    
+    response = await (model | parser).ainvoke(messages)
+    
+    if use_cache:
+        try:
+            config.REPORT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(config.dumps(response))
+        except OSError as e:
+            logger.warning(f"⚠️ Error saving report response to cache: {e}")
+    return response
+
 def load_aggregated_analysis(analysis_path: Optional[str] = None) -> dict:
-    """Load aggregated analysis results."""
+    """Load aggregated analysis results (zstd-compressed or plain JSON)."""
     if analysis_path is None:
-        analysis_path = str(config.DATA_DIR / "aggregated_analysis.json")
+        analysis_path = config.get_aggregated_analysis_path()
+        if not analysis_path.exists():
+            analysis_path = config.AGGREGATED_ANALYSIS_FILE
     
     try:
-        with open(analysis_path, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        return config.read_json_file(analysis_path)
     except FileNotFoundError:
-        print(f"❌ Aggregated analysis file not found: {analysis_path}")
-        print("ℹ️ Please run analyze_all.py first to generate the analysis data.")
+        logger.error(f"❌ Aggregated analysis file not found: {analysis_path}")
+        logger.info("ℹ️ Please run analyze_all.py first to generate the analysis data.")
         raise
     except json.JSONDecodeError as e:
-        print(f"❌ Error parsing aggregated analysis file: {e}")
-        print("ℹ️ The analysis file may be corrupted. Please run analyze_all.py again.")
+        logger.error(f"❌ Error parsing aggregated analysis file: {e}")
+        logger.info("ℹ️ The analysis file may be corrupted. Please run analyze_all.py again.")
+        raise
+    except RuntimeError as e:  # compressed file without zstandard installed
+        logger.error(f"❌ Cannot read aggregated analysis file: {e}")
         raise
 
 def generate_video_summaries_for_report(video_analyses: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -45,6 +108,10 @@ def generate_video_summaries_for_report(video_analyses: list[dict[str, Any]]) ->
     
     return summaries
 
+def format_video_summaries(video_analyses: list[dict[str, Any]]) -> str:
+    """Video summaries as the indented JSON the report prompts embed."""
+    return config.dumps(generate_video_summaries_for_report(video_analyses)).decode('utf-8')
+
 def get_config_with_fallback(analysis_config: dict[str, Any]) -> dict[str, Any]:
     """Get config with fallback to original YAML config for missing keys."""
     original_config = get_config()
@@ -60,11 +127,8 @@ def get_config_with_fallback(analysis_config: dict[str, Any]) -> dict[str, Any]:
     
     return merged_config
 
-def generate_audience_insights_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> str:
-    """Generate audience insights report from video analyses."""
-    if not any(analysis.get('audience_analysis') for analysis in video_analyses):
-        return "Audience analysis was not enabled for this analysis."
-    
+def format_audience_inputs(video_analyses: list[dict[str, Any]]) -> tuple[str, str]:
+    """Format the aggregated and per-video audience data for the report prompts."""
     # Extract audience analyses
     audience_analyses = [
         analysis['audience_analysis'] 
@@ -72,34 +136,34 @@ def generate_audience_insights_report(video_analyses: list[dict[str, Any]], anal
         if analysis.get('audience_analysis')
     ]
     
-    if not audience_analyses:
-        return "No audience analysis data available."
-    
     # Aggregate audience data across all videos
     aggregated_data = aggregate_audience_analysis(audience_analyses)
+    # The generation time tells the model nothing and would make every prompt unique to the report cache
+    aggregated_data.pop('analysis_timestamp', None)
     
     # Format audience data for the prompt
-    audience_data = json.dumps(aggregated_data, indent=2, ensure_ascii=False)
+    audience_data = config.dumps(aggregated_data).decode('utf-8')
     
     # Format individual video analyses
-    video_analyses_text = ""
-    for i, analysis in enumerate(audience_analyses, 1):
-        video_analyses_text += f"\n=== Video {i} Audience Analysis ===\n"
-        video_analyses_text += json.dumps(analysis, indent=2, ensure_ascii=False)
-        video_analyses_text += "\n"
-    
-    # Generate the report using LLM
-    config_with_fallback = get_config_with_fallback(analysis_config)
-    model = ChatOpenAI(
-        model=config_with_fallback['analysis_model'],
-        temperature=0.1
+    video_analyses_text = "".join(
+        f"\n=== Video {i} Audience Analysis ===\n{config.dumps(analysis).decode('utf-8')}\n"
+        for i, analysis in enumerate(audience_analyses, 1)
     )
     
-    prompt = ChatPromptTemplate.from_template(prompts.AUDIENCE_INSIGHTS_REPORT_PROMPT)
+    return audience_data, video_analyses_text
+
+async def generate_audience_insights_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> str:
+    """Generate audience insights report from video analyses."""
+    if not any(analysis.get('audience_analysis') for analysis in video_analyses):
+        return "Audience analysis was not enabled for this analysis."
+    
+    audience_data, video_analyses_text = format_audience_inputs(video_analyses)
     
-    chain = prompt | model | StrOutputParser()
+    # Generate the report using LLM
+    config_with_fallback = get_config_with_fallback(analysis_config)
+    model = get_report_model(config_with_fallback['analysis_model'])
     
-    response = chain.invoke({
+    response = await invoke_cached(AUDIENCE_INSIGHTS_TEMPLATE, model, StrOutputParser(), {
         "audience_data": audience_data,
         "video_analyses": video_analyses_text,
         "output_language": config_with_fallback['output_language']
@@ -107,37 +171,28 @@ def generate_audience_insights_report(video_analyses: list[dict[str, Any]], anal
     
     return response
 
-def generate_key_insights_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> str:
+async def generate_key_insights_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any],
+                                       video_summaries_json: Optional[str] = None) -> str:
     """Generate focused key insights report using centralized prompt."""
-    video_summaries = generate_video_summaries_for_report(video_analyses)
-    
-    # Convert to JSON string for the prompt
-    video_summaries_text = json.dumps(video_summaries, indent=2, ensure_ascii=False)
+    if video_summaries_json is None:
+        video_summaries_json = format_video_summaries(video_analyses)
     
     # Generate the report using LLM
     config_with_fallback = get_config_with_fallback(analysis_config)
-    model = ChatOpenAI(
-        model=config_with_fallback['analysis_model'],
-        temperature=0.1
-    )
-    
-    prompt = ChatPromptTemplate.from_template(prompts.KEY_INSIGHTS_REPORT_PROMPT)
+    model = get_report_model(config_with_fallback['analysis_model'])
     
-    chain = prompt | model | StrOutputParser()
-    
-    response = chain.invoke({
-        "video_summaries": video_summaries_text,
+    response = await invoke_cached(KEY_INSIGHTS_TEMPLATE, model, StrOutputParser(), {
+        "video_summaries": video_summaries_json,
         "output_language": config_with_fallback['output_language']
     })
     
     return response
 
-def generate_comprehensive_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> str:
+async def generate_comprehensive_report(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any],
+                                        video_summaries_json: Optional[str] = None) -> str:
     """Generate comprehensive analysis report."""
-    video_summaries = generate_video_summaries_for_report(video_analyses)
-    
-    # Convert to JSON string for the prompt
-    video_summaries_json = json.dumps(video_summaries, indent=2, ensure_ascii=False)
+    if video_summaries_json is None:
+        video_summaries_json = format_video_summaries(video_analyses)
     
     # Get config with fallbacks
     config_with_fallback = get_config_with_fallback(analysis_config)
@@ -145,23 +200,46 @@ def generate_comprehensive_report(video_analyses: list[dict[str, Any]], analysis
     # Generate audience insights if available
     audience_insights = ""
     if config_with_fallback['analyze_audience']:
-        audience_insights = generate_audience_insights_report(video_analyses, analysis_config)
+        audience_insights = await generate_audience_insights_report(video_analyses, analysis_config)
     else:
         audience_insights = "Audience analysis was not enabled for this analysis."
     
     # Generate the report using LLM
-    model = ChatOpenAI(
-        model=config_with_fallback['analysis_model'],
-        temperature=0.1
-    )
+    model = get_report_model(config_with_fallback['analysis_model'])
     
-    prompt = ChatPromptTemplate.from_template(prompts.COMPREHENSIVE_REPORT_PROMPT)
+    response = await invoke_cached(COMPREHENSIVE_TEMPLATE, model, StrOutputParser(), {
+        "video_summaries_json": video_summaries_json,
+        "audience_insights": audience_insights,
+        "analysis_model": config_with_fallback['analysis_model'],
+        "videos_analyzed": len(video_analyses),
+        "language_filter": config_with_fallback['language_filter'],
+        "min_length": config_with_fallback['min_comment_length'],
+        "output_language": config_with_fallback['output_language']
+    })
     
-    chain = prompt | model | StrOutputParser()
+    return response
+
+async def generate_all_reports_batched(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> dict[str, str]:
+    """Generate the key insights and comprehensive reports with a single LLM call.
+
+    The shared video summaries and audience data are sent once and the audience insights
+    are written straight into the comprehensive report, replacing three sequential calls.
+    Returns {'key_insights': ..., 'comprehensive': ...}.
+    """
+    video_summaries_json = format_video_summaries(video_analyses)
     
-    response = chain.invoke({
+    config_with_fallback = get_config_with_fallback(analysis_config)
+    if config_with_fallback['analyze_audience'] and any(a.get('audience_analysis') for a in video_analyses):
+        audience_data, video_analyses_text = format_audience_inputs(video_analyses)
+    else:
+        audience_data, video_analyses_text = "Audience analysis was not enabled for this analysis.", ""
+    
+    model = get_report_model(config_with_fallback['analysis_model'])
+    
+    response = await invoke_cached(BATCHED_REPORTS_TEMPLATE, model, JsonOutputParser() | check_report_sections, {
         "video_summaries_json": video_summaries_json,
-        "audience_insights": audience_insights,
+        "audience_data": audience_data,
+        "video_analyses": video_analyses_text,
         "analysis_model": config_with_fallback['analysis_model'],
         "videos_analyzed": len(video_analyses),
         "language_filter": config_with_fallback['language_filter'],
@@ -171,6 +249,35 @@ def generate_comprehensive_report(video_analyses: list[dict[str, Any]], analysis
     
     return response
 
+def check_report_sections(response: Any) -> dict[str, str]:
+    """Keep the batched report sections, rejecting a response that lacks any of them."""
+    if not isinstance(response, dict) or not all(isinstance(response.get(key), str) for key in REPORT_SECTIONS):
+        raise OutputParserException(f"Batched report response is missing one of {REPORT_SECTIONS}")
+    return {key: response[key] for key in REPORT_SECTIONS}
+
+async def generate_reports(video_analyses: list[dict[str, Any]], analysis_config: dict[str, Any]) -> tuple[str, str]:
+    """Generate the comprehensive and key insights reports, returned in that order.
+
+    The two reports are independent, so their requests run concurrently; the audience
+    insights still precede the comprehensive report, which embeds them.
+    """
+    if get_config().get('batch_reports', False):
+        logger.info("Generating all reports in one request...")
+        try:
+            reports = await generate_all_reports_batched(video_analyses, analysis_config)
+            return reports['comprehensive'], reports['key_insights']
+        except OutputParserException as e:
+            logger.warning(f"⚠️ Batched report response could not be parsed ({e}), generating reports separately")
+    
+    logger.info("Generating comprehensive analysis and key insights reports...")
+    # Both reports embed the same summaries; serialize them once
+    video_summaries_json = format_video_summaries(video_analyses)
+    comprehensive_report, key_insights_report = await asyncio.gather(
+        generate_comprehensive_report(video_analyses, analysis_config, video_summaries_json),
+        generate_key_insights_report(video_analyses, analysis_config, video_summaries_json)
+    )
+    return comprehensive_report, key_insights_report
+
 def save_report(report_content: str, filename: str) -> None:
     """Save report to file."""
     # Convert Path objects to strings if needed
@@ -184,33 +291,45 @@ def save_report(report_content: str, filename: str) -> None:
     with open(filename, 'w', encoding='utf-8') as file:
         file.write(report_content)
     
-    print(f"Report saved to {filename}")
+    logger.info(f"Report saved to {filename}")
+
+def link_latest_report(filename: str, latest_filename: str) -> None:
+    """Point latest_filename at an already saved report without writing its content again.
+
+    Uses a hard link swapped in atomically; filesystems without hard links get a copy.
+    """
+    tmp_filename = f"{latest_filename}.tmp"
+    Path(tmp_filename).unlink(missing_ok=True)
+    try:
+        os.link(filename, tmp_filename)
+    except OSError:
+        shutil.copyfile(filename, tmp_filename)
+    os.replace(tmp_filename, latest_filename)
+    
+    logger.info(f"Report saved to {latest_filename}")
 
 def main():
     """Generate final summary reports from aggregated analysis."""
-    print("Loading aggregated analysis...")
+    start_listener()
+    logger.info("Loading aggregated analysis...")
     
     # Load the aggregated analysis data
     try:
         aggregated_data = load_aggregated_analysis()
-    except (FileNotFoundError, json.JSONDecodeError):
+    except (FileNotFoundError, json.JSONDecodeError, RuntimeError):
         return
     
-    video_analyses = aggregated_data.get('video_analyses', [])
-    analysis_config = aggregated_data.get('config', {})
+    # Keep only what the reports use and drop the rest of the parsed file
+    video_analyses = aggregated_data.pop('video_analyses', [])
+    analysis_config = aggregated_data.pop('config', {})
+    del aggregated_data
     
-    print(f"Generating reports for {len(video_analyses)} videos...")
+    logger.info(f"Generating reports for {len(video_analyses)} videos...")
     
     # Create timestamp for files
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
     
-    # Generate comprehensive report with audience insights
-    print("Generating comprehensive analysis report...")
-    comprehensive_report = generate_comprehensive_report(video_analyses, analysis_config)
-    
-    # Generate key insights report (focused version)
-    print("Generating key insights report...")
-    key_insights_report = generate_key_insights_report(video_analyses, analysis_config)
+    comprehensive_report, key_insights_report = asyncio.run(generate_reports(video_analyses, analysis_config))
     
     # Save timestamped reports
     comprehensive_filename = str(config.REPORTS_DIR / f"comprehensive_analysis_{timestamp}.md")
@@ -223,16 +342,14 @@ def main():
     latest_comprehensive_filename = str(config.REPORTS_DIR / "latest_comprehensive_analysis.md")
     latest_key_insights_filename = str(config.REPORTS_DIR / "latest_key_insights.md")
     
-    save_report(comprehensive_report, latest_comprehensive_filename)
-    save_report(key_insights_report, latest_key_insights_filename)
+    link_latest_report(comprehensive_filename, latest_comprehensive_filename)
+    link_latest_report(key_insights_filename, latest_key_insights_filename)
     
-    print("\n" + "="*50)
-    print("REPORT GENERATION COMPLETE")
-    print("="*50)
-    print(f"Comprehensive Analysis: {comprehensive_filename}")
-    print(f"Key Insights Report: {key_insights_filename}")
-    print(f"Latest Comprehensive: {latest_comprehensive_filename}")
-    print(f"Latest Key Insights: {latest_key_insights_filename}")
+    logger.info("\n" + "="*50 + "\nREPORT GENERATION COMPLETE\n" + "="*50)
+    logger.info(f"Comprehensive Analysis: {comprehensive_filename}")
+    logger.info(f"Key Insights Report: {key_insights_filename}")
+    logger.info(f"Latest Comprehensive: {latest_comprehensive_filename}")
+    logger.info(f"Latest Key Insights: {latest_key_insights_filename}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
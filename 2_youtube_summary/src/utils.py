@@ -3,16 +3,33 @@ Utility functions for YouTube Comments Analysis Pipeline.
 Common helper functions to reduce code duplication.
 """
 
-import json
+import os
+import codecs
 import re
+import time
+import functools
 from typing import Any, Optional
 from pathlib import Path
 from datetime import datetime
 
+from langdetect import detect
+from langdetect.lang_detect_exception import LangDetectException
+
+import config
+from src.logger import logger
+
+try:
+    import fasttext
+except ImportError:  # fasttext is optional, fall back to langdetect
+    fasttext = None
+
+FASTTEXT_LABEL_PREFIX = "__label__"
+
 def setup_logging():
     """Setup basic logging configuration."""
     import logging
     
+    Path('logs').mkdir(exist_ok=True)
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(message)s',
@@ -24,55 +41,68 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 def print_info(message: str):
-    """Print formatted info message."""
-    print(f"ℹ️ {message}")
+    """Log formatted info message."""
+    logger.info(f"ℹ️ {message}")
 
 def print_progress(message: str, emoji: str = "ℹ️"):
-    """Print formatted progress message."""
-    print(f"{emoji} {message}")
+    """Log formatted progress message."""
+    logger.info(f"{emoji} {message}")
 
 
 def print_success(message: str):
-    """Print formatted success message."""
-    print(f"✅ {message}")
+    """Log formatted success message."""
+    logger.info(f"✅ {message}")
 
 
 def print_error(message: str):
-    """Print formatted error message."""
-    print(f"❌ {message}")
+    """Log formatted error message."""
+    logger.error(f"❌ {message}")
 
 
 def print_warning(message: str):
-    """Print formatted warning message."""
-    print(f"⚠️ {message}")
+    """Log formatted warning message."""
+    logger.warning(f"⚠️ {message}")
 
 
 def print_section(title: str):
-    """Print formatted section header."""
-    print(f"\n{'='*60}")
-    print(f"📋 {title}")
-    print(f"{'='*60}")
+    """Log formatted section header."""
+    logger.info(f"\n{'='*60}\n📋 {title}\n{'='*60}")
 
 
 def print_step(step_num: int, total_steps: int, description: str):
-    """Print formatted step progress."""
-    print(f"\n🔄 Step {step_num}/{total_steps}: {description}")
-    print("-" * 50)
+    """Log formatted step progress."""
+    logger.info(f"\n🔄 Step {step_num}/{total_steps}: {description}\n{'-' * 50}")
+
+
+_URL_RE = re.compile(r'https?://[^\s]+')
 
 
 def is_url_only(text: str) -> bool:
     """Check if text contains only URLs."""
-    url_pattern = r'https?://[^\s]+'
-    text_without_urls = re.sub(url_pattern, '', text).strip()
-    return len(text_without_urls) == 0 and len(re.findall(url_pattern, text)) > 0
+    return not _URL_RE.sub('', text).strip() and _URL_RE.search(text) is not None
+
+
+@functools.lru_cache(maxsize=1)
+def get_language_model():
+    """Load the fastText language-ID model once per process (None if fasttext or the model is missing)."""
+    if fasttext is None or not config.LANGUAGE_ID_MODEL_FILE.exists():
+        return None
+    return fasttext.load_model(str(config.LANGUAGE_ID_MODEL_FILE))
 
 
 def detect_language_safe(text: str) -> str:
-    """Safely detect language of text, return 'unknown' if detection fails."""
+    """Safely detect language of text, return 'unknown' if detection fails.
+
+    Uses the fastText model when it is available and falls back to langdetect.
+    """
+    model = get_language_model()
+    if model is not None:
+        # fastText predicts one line per text
+        labels, _ = model.predict([text.strip().replace("\n", " ")])
+        return labels[0][0].removeprefix(FASTTEXT_LABEL_PREFIX) if labels[0] else 'unknown'
     try:
-        from langdetect import detect
         return detect(text)
-    except:
+    except LangDetectException:
         return 'unknown'
 
 
@@ -88,8 +118,11 @@ def save_json_safely(data: dict[str, Any], filepath: Path, encoding: str = 'utf-
         # Ensure directory exists
         filepath.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(filepath, 'w', encoding=encoding) as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        payload = config.dumps(data)
+        if codecs.lookup(encoding).name == 'utf-8':
+            filepath.write_bytes(payload)
+        else:
+            filepath.write_text(payload.decode('utf-8'), encoding=encoding)
         return True
     except Exception as e:
         print_error(f"Error saving JSON to {filepath}: {e}")
@@ -99,8 +132,7 @@ def save_json_safely(data: dict[str, Any], filepath: Path, encoding: str = 'utf-
 def load_json_safely(filepath: Path, encoding: str = 'utf-8') -> Optional[dict[str, Any]]:
     """Safely load JSON data from file."""
     try:
-        with open(filepath, 'r', encoding=encoding) as f:
-            return json.load(f)
+        return config.loads(filepath.read_text(encoding=encoding))
     except Exception as e:
         print_error(f"Error loading JSON from {filepath}: {e}")
         return None
@@ -124,17 +156,17 @@ def clean_temp_files(temp_dir: Path, max_age_hours: int = 24):
     if not temp_dir.exists():
         return 0
     
-    import time
-    current_time = time.time()
-    max_age_seconds = max_age_hours * 3600
+    cutoff = time.time() - max_age_hours * 3600
     
     cleaned_count = 0
-    for temp_file in temp_dir.glob("*"):
-        if temp_file.is_file() and temp_file.stat().st_mtime < (current_time - max_age_seconds):
-            try:
-                temp_file.unlink()
-                cleaned_count += 1
-            except Exception as e:
-                print_warning(f"Could not remove temp file {temp_file}: {e}")
+    # DirEntry caches the file type from the directory listing, so each file costs one stat
+    with os.scandir(temp_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.unlink(entry.path)
+                    cleaned_count += 1
+                except Exception as e:
+                    print_warning(f"Could not remove temp file {entry.path}: {e}")
     
     return cleaned_count
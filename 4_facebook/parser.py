@@ -4,13 +4,39 @@ Processes scraped Facebook posts data and creates structured dataset.
 """
 
 import json
-import pandas as pd
 import csv
-from typing import List, Dict, Any
+from collections import Counter
+from typing import List, Dict, Any, Union
 import argparse
 
+from pydantic import TypeAdapter, ValidationError
+
 from models import FacebookPost
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to stdlib json
+    orjson = None
+
+# Parses and validates the whole input file in one pass (pydantic-core, in Rust)
+POSTS_ADAPTER = TypeAdapter(List[FacebookPost])
+
+COLUMN_ORDER = [
+    'post_id', 'text', 'url', 'content_type', 
+    'shares_count', 'comments_count', 'likes_count',
+    'views_count', 'video_duration_seconds',
+    'timestamp', 'post_date'
+]
+
+_NEWLINE_TO_SPACE = str.maketrans('\n', ' ')
+
+def clean_text(text: str) -> str:
+    """Strip the text and turn line breaks (\\r\\n or \\n) into single spaces."""
+    text = text.strip()
+    if '\n' in text:
+        text = text.replace('\r\n', '\n').translate(_NEWLINE_TO_SPACE)
+    return text
+
 def determine_content_type(post: FacebookPost) -> str:
     """Determine the content type of a Facebook post."""
     if post.isVideo:
@@ -26,14 +52,30 @@ def determine_content_type(post: FacebookPost) -> str:
     else:
         return 'text'
 
-def extract_post_data(posts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Extract structured data from Facebook posts."""
+def load_posts(path: str) -> List[Union[FacebookPost, Dict[str, Any]]]:
+    """Load posts from a JSON file, parsed straight into FacebookPost models when all are valid.
+
+    If any post fails validation, the raw dicts are returned instead so that
+    extract_post_data can skip just the invalid ones.
+    """
+    with open(path, 'rb') as file:
+        raw = file.read()
+    try:
+        return POSTS_ADAPTER.validate_json(raw)
+    except ValidationError:
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def extract_post_data(posts_data: List[Union[FacebookPost, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Extract structured data from Facebook posts, skipping invalid posts and posts without text."""
     structured_posts = []
     for post_data in posts_data:
         try:
-            post = FacebookPost(**post_data)
+            post = FacebookPost.model_validate(post_data)
+            text = clean_text(post.text)
+            if not text:
+                continue
             content_type = determine_content_type(post)
-            text = post.text.strip().replace('\r\n', ' ').replace('\n', ' ')
             
             post_info = {
                 'post_id': post.postId,
@@ -52,12 +94,12 @@ def extract_post_data(posts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 post_info['views_count'] = post.viewsCount or 0
                 if post.media and len(post.media) > 0:
                     duration_ms = post.media[0].playable_duration_in_ms
-                    post_info['video_duration_seconds'] = round(duration_ms / 1000, 1) if duration_ms else 0
+                    post_info['video_duration_seconds'] = round(duration_ms / 1000, 1) if duration_ms else 0.0
                 else:
-                    post_info['video_duration_seconds'] = 0
+                    post_info['video_duration_seconds'] = 0.0
             else:
                 post_info['views_count'] = 0
-                post_info['video_duration_seconds'] = 0
+                post_info['video_duration_seconds'] = 0.0
                 
             structured_posts.append(post_info)
             
@@ -70,31 +112,30 @@ def extract_post_data(posts_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 def save_to_csv(data: List[Dict[str, Any]], filename: str) -> None:
     """Save structured data to CSV file."""
-    df = pd.DataFrame(data)
-    df = df[df['text'] != '']
-    column_order = [
-        'post_id', 'text', 'url', 'content_type', 
-        'shares_count', 'comments_count', 'likes_count',
-        'views_count', 'video_duration_seconds',
-        'timestamp', 'post_date'
-    ]
-    df = df[column_order]
     with open(filename, 'w', encoding='utf-8', newline='') as f:
-        df.to_csv(f, index=False, quoting=csv.QUOTE_ALL)
+        writer = csv.DictWriter(f, fieldnames=COLUMN_ORDER, quoting=csv.QUOTE_ALL,
+                                lineterminator='\n', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(data)
 
 
 def display_summary(data: List[Dict[str, Any]]) -> None:
     """Display summary statistics."""
-    df = pd.DataFrame(data)
-    df = df[df['text'] != '']  # Filter empty text
+    content_types = Counter()
+    total_engagement = 0
+    video_views = 0
+    for post in data:
+        content_types[post['content_type']] += 1
+        total_engagement += (post['likes_count'] or 0) + (post['comments_count'] or 0) + (post['shares_count'] or 0)
+        if post['content_type'] == 'video':
+            video_views += post['views_count']
     
-    print(f"Total posts: {len(df)}")
-    print(f"Content types: {df['content_type'].value_counts().to_dict()}")
-    print(f"Total engagement: {df['likes_count'].sum() + df['comments_count'].sum() + df['shares_count'].sum():,}")
+    print(f"Total posts: {content_types.total()}")
+    print(f"Content types: {dict(content_types.most_common())}")
+    print(f"Total engagement: {total_engagement:,}")
     
-    video_posts = df[df['content_type'] == 'video']
-    if not video_posts.empty:
-        print(f"Video views: {video_posts['views_count'].sum():,}")
+    if content_types['video']:
+        print(f"Video views: {video_views:,}")
 
 
 def main():
@@ -113,8 +154,7 @@ def main():
     args = parser.parse_args()
 
     try:
-        with open(args.input, 'r', encoding='utf-8') as file:
-            posts_data = json.load(file)
+        posts_data = load_posts(args.input)
         
         structured_data = extract_post_data(posts_data)
         save_to_csv(structured_data, args.output)